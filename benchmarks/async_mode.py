@@ -0,0 +1,199 @@
+"""Compare the sync (WSGI) and async (ASGI) serving modes under concurrent load.
+
+Starts a mock PostgREST server with injectable latency in a subprocess, then for each
+mode runs the app in a subprocess with one worker and fires concurrent GET /api/notes
+requests (served natively in async mode) and GET /api/notes/export requests (served
+by the Flask fallback in async mode).
+The sync worker has a fixed thread pool (like a gunicorn gthread worker); the async
+worker is uvicorn running src.asgi:app.
+
+uvicorn and asgiref are in requirements.txt.
+
+Usage: python benchmarks/async_mode.py [--latency 50] [--concurrency 64] [--requests 1000] [--threads 8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve_mock_postgrest(port, latency, notes):
+    """Serve canned notes/note_tags/tags rows under /rest/v1 after `latency` seconds.
+
+    asyncio-based with keep-alive, so the mock itself is never the bottleneck.
+    """
+    tables = {
+        'notes': [
+            {'id': f'n{i}', 'title': f'Note {i}', 'content': 'x' * 200,
+             'created_at': '2025-01-01T00:00:00', 'updated_at': '2025-01-01T00:00:00'}
+            for i in range(notes)
+        ],
+        'note_tags': [{'note_id': f'n{i}', 'tag_id': f't{i % 5}'} for i in range(notes)],
+        'tags': [{'id': f't{i}', 'name': f'tag{i}', 'color': '#6B73FF', 'created_at': '2025-01-01T00:00:00'} for i in range(5)]
+    }
+    bodies = {name: json.dumps(rows).encode() for name, rows in tables.items()}
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                path = head.split(b' ', 2)[1].decode()
+                await asyncio.sleep(latency)
+                body = bodies.get(path.split('?')[0].rsplit('/', 1)[-1], b'[]')
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def run():
+        server = await asyncio.start_server(handle, '127.0.0.1', port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+def serve_sync(port, threads):
+    """Run the Flask app on a WSGI server with a fixed-size thread pool"""
+    sys.path.insert(0, ROOT)
+    from src.main import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PoolWSGIServer(WSGIServer):
+        request_queue_size = 1024
+        pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    make_server('127.0.0.1', port, app, server_class=PoolWSGIServer, handler_class=QuietHandler).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def load(url, concurrency, total):
+    latencies = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    resp = await client.get(url)
+                    if resp.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'req_per_s': total / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=50, help='mock database latency in ms')
+    parser.add_argument('--notes', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8, help='threads for the sync worker')
+    parser.add_argument('--serve-sync', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--serve-db', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_sync:
+        serve_sync(args.serve_sync, args.threads)
+        return
+    if args.serve_db:
+        serve_mock_postgrest(args.serve_db, args.latency / 1000, args.notes)
+        return
+
+    db_port = free_port()
+    db = subprocess.Popen([sys.executable, __file__, '--serve-db', str(db_port),
+                           '--latency', str(args.latency), '--notes', str(args.notes)])
+    wait_for(db_port)
+    env = {
+        **os.environ,
+        'SUPABASE_URL': f'http://127.0.0.1:{db_port}',
+        'SUPABASE_ANON_KEY': 'bench.bench.bench',
+        'PYTHONPATH': ROOT
+    }
+    modes = {
+        'sync ': lambda port: [sys.executable, __file__, '--serve-sync', str(port), '--threads', str(args.threads)],
+        'async': lambda port: [sys.executable, '-m', 'uvicorn', 'src.asgi:app', '--port', str(port),
+                               '--log-level', 'warning', '--no-access-log']
+    }
+    # A native async route, and one the async mode serves through the Flask fallback
+    paths = ['/api/notes', '/api/notes/export']
+    print(f"{args.latency:.0f} ms per DB call, {args.concurrency} concurrent, "
+          f"{args.requests} requests per route, 1 worker")
+    for name, command in modes.items():
+        port = free_port()
+        proc = subprocess.Popen(command(port), cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+        try:
+            wait_for(port)
+            for path in paths:
+                url = f'http://127.0.0.1:{port}{path}'
+                asyncio.run(load(url, min(args.concurrency, 4), 20))  # warm up
+                result = asyncio.run(load(url, args.concurrency, args.requests))
+                print(f"  {name} GET {path:<18} {result['req_per_s']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+                      f"p95 {result['p95_ms']:7.1f} ms  errors {result['errors']}")
+        finally:
+            proc.terminate()
+            proc.wait()
+    db.terminate()
+    db.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark the related-notes TF-IDF index.
+
+Builds an index over N synthetic notes (Zipf-distributed vocabulary), then times
+top-k queries, incremental upserts (with full deltas merged by a background thread,
+as the app does), queries while a merge runs, and save/load with memory-mapped arrays.
+
+Usage: python benchmarks/related_notes.py [--notes 100000] [--words 120] [--queries 500]
+                                          [--upserts 2500] [--k 10]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.lib.related_index import RelatedNotesIndex
+
+
+def synthetic_notes(n, words, vocab_size, seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = [f'w{i}' for i in range(vocab_size)]
+    for i in range(n):
+        ranks = np.minimum(rng.zipf(1.2, size=words), vocab_size) - 1
+        yield f'n{i}', ' '.join(vocab[r] for r in ranks), f'2025-01-01T00:00:{i:09d}'
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p95, p99 = (samples[max(int(len(samples) * q) - 1, 0)] for q in (0.95, 0.99))
+    return (f"p50 {statistics.median(samples) * 1000:.2f} ms  p95 {p95 * 1000:.2f} ms  "
+            f"p99 {p99 * 1000:.2f} ms  max {samples[-1] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--words', type=int, default=120, help='words per note')
+    parser.add_argument('--vocab', type=int, default=50_000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--upserts', type=int, default=2500, help='at least delta_max (1000) to include merges')
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    directory = os.path.join(tempfile.mkdtemp(), 'index')
+    try:
+        index = RelatedNotesIndex(directory)
+        start = time.perf_counter()
+        index.bulk_load(synthetic_notes(args.notes, args.words, args.vocab))
+        print(f"build + save: {args.notes} notes, {index.main.nnz:,} nonzeros, "
+              f"{len(index.vocab):,} terms in {time.perf_counter() - start:.1f} s")
+
+        rng = np.random.default_rng(1)
+        targets = [f'n{i}' for i in rng.integers(0, args.notes, size=args.queries)]
+        timings = []
+        for note_id in targets:
+            start = time.perf_counter()
+            index.related(note_id, args.k)
+            timings.append(time.perf_counter() - start)
+        print(f"related(k={args.k}): {percentiles(timings)}")
+
+        # Edits to existing notes: same ids, new text and a newer updated_at. As in the
+        # app, a full delta is merged by a background thread, not by the upsert
+        merge_due, merge_times = threading.Event(), []
+        done = False
+
+        def merger():
+            while merge_due.wait() and not done:
+                merge_due.clear()
+                start = time.perf_counter()
+                index.merge()
+                merge_times.append(time.perf_counter() - start)
+
+        thread = threading.Thread(target=merger, daemon=True)
+        thread.start()
+        timings = []
+        for note_id, text, updated_at in synthetic_notes(args.upserts, args.words, args.vocab, seed=2):
+            start = time.perf_counter()
+            index.upsert(note_id, text, '2026' + updated_at[4:])
+            timings.append(time.perf_counter() - start)
+            if index.needs_merge():
+                merge_due.set()
+        done = True
+        merge_due.set()
+        thread.join()
+        print(f"upsert x{args.upserts} ({len(merge_times)} background merges): {percentiles(timings)}")
+
+        timings = []
+        for note_id in targets[:100]:
+            start = time.perf_counter()
+            index.related(note_id, args.k)
+            timings.append(time.perf_counter() - start)
+        print(f"related with {len(index.delta)} delta rows: {percentiles(timings)}")
+
+        # Queries keep running while a merge is in progress in another thread
+        thread = threading.Thread(target=index.merge)
+        start = time.perf_counter()
+        thread.start()
+        timings = []
+        for note_id in targets:
+            if not thread.is_alive():
+                break
+            query_start = time.perf_counter()
+            index.related(note_id, args.k)
+            timings.append(time.perf_counter() - query_start)
+        thread.join()
+        print(f"merge + save: {time.perf_counter() - start:.2f} s; "
+              f"{len(timings)} related() calls during it: {percentiles(timings)}")
+
+        start = time.perf_counter()
+        loaded = RelatedNotesIndex.load(directory)
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded.related(targets[0], args.k)
+        print(f"load (mmap): {load_s * 1000:.0f} ms, first query {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(os.path.dirname(directory), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
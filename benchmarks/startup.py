@@ -0,0 +1,84 @@
+"""Cold-start benchmark for the Flask app.
+
+Runs `python -X importtime` on `src.main` in fresh interpreters and reports the
+total import time, the slowest top-level imports, and the time to serve the first
+request for a few routes (each in its own process, so lazy loading is visible).
+
+Usage: python benchmarks/startup.py [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+from src.main import app
+client = app.test_client()
+client.{method}({path!r})
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def import_profile():
+    """Return (total_us, [(cumulative_us, module), ...]) for `import src.main`.
+
+    The list holds the modules imported directly by src.main.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    children = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Nested imports are listed before their parent, indented two spaces per level
+        if depth == 3:
+            children.append((cumulative, module))
+        elif depth == 1:
+            if module == 'src.main':
+                return cumulative, children
+            children = []
+    raise RuntimeError(proc.stderr[-2000:])
+
+
+def first_request_ms(method, path):
+    proc = subprocess.run(
+        [sys.executable, '-c', FIRST_REQUEST.format(method=method, path=path)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        total, top_level = import_profile()
+        totals.append(total)
+    print(f"import src.main: median {statistics.median(totals) / 1000:.1f} ms over {args.runs} runs")
+    print("slowest imports made by src.main (last run):")
+    for us, module in sorted(top_level, reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {module}")
+
+    print("first request (import + app + request):")
+    for method, path in [('get', '/'), ('get', '/api/tags'), ('post', '/api/translate'), ('get', '/api/users')]:
+        samples = [first_request_ms(method, path) for _ in range(args.runs)]
+        print(f"  {method.upper():4} {path:<16} median {statistics.median(samples):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
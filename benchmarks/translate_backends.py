@@ -0,0 +1,189 @@
+"""Exercise the translation backend router against local mock backends.
+
+Starts a mock GitHub Models endpoint and a mock LibreTranslate server, each with
+injectable latency and failures, points the translate routes at them and runs
+failover, client error, circuit breaker (open and half-open), hedging and
+concurrency scenarios through `call_translate_api`. Prints one line per check and
+exits non-zero if any check fails.
+
+Usage: python benchmarks/translate_backends.py [--latency 50]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MockBackend:
+    """A local HTTP backend whose latency and failure mode can be changed at runtime"""
+
+    def __init__(self, body):
+        self.body = json.dumps(body).encode()
+        self.latency = 0.0
+        self.fail = False
+        self.status = 503
+        self.hits = 0
+        self.lock = threading.Lock()
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with backend.lock:
+                    backend.hits += 1
+                time.sleep(backend.latency)
+                if backend.fail:
+                    self.send_response(backend.status)
+                    self.end_headers()
+                    self.wfile.write(b'unavailable')
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(backend.body)))
+                self.end_headers()
+                self.wfile.write(backend.body)
+
+        ThreadingHTTPServer.request_queue_size = 128
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def reset(self, latency=0.0, fail=False, status=503):
+        self.latency = latency
+        self.fail = fail
+        self.status = status
+        with self.lock:
+            self.hits = 0
+
+
+results = []
+
+
+def check(name, ok, detail=''):
+    results.append(ok)
+    print(f"  [{'ok' if ok else 'FAIL'}] {name}{f'  ({detail})' if detail else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=50, help='normal mock backend latency in ms')
+    args = parser.parse_args()
+    latency = args.latency / 1000
+
+    primary = MockBackend({'choices': [{'message': {'content': 'from-primary'}}]})
+    secondary = MockBackend({'translatedText': 'from-secondary'})
+    os.environ.update({
+        'GITHUB_TOKEN': 'mock',
+        'GITHUB_MODELS_ENDPOINT': primary.url,
+        'TRANSLATE_URL': secondary.url,
+        'GITHUB_MODELS_TIMEOUT': '10',
+        'TRANSLATE_TIMEOUT': '10'
+    })
+    sys.path.insert(0, ROOT)
+    import src.routes.translate as translate
+    from src.lib.backend_router import BackendRouter
+
+    def use_router(hedge=False, cooldown=30.0):
+        translate.translate_router = BackendRouter(
+            [('github_models', translate.call_github_models), ('libretranslate', translate.call_libretranslate)],
+            hedge=hedge, failure_threshold=3, cooldown=cooldown
+        )
+        return translate.translate_router
+
+    def call():
+        return translate.call_translate_api('hello', 'fr')
+
+    print('failover')
+    use_router()
+    primary.reset(latency, fail=True)
+    secondary.reset(latency)
+    result = call()
+    check('falls over to the next backend on error', result.get('translatedText') == 'from-secondary', result)
+
+    print('client errors')
+    router = use_router()
+    primary.reset(latency, fail=True, status=400)
+    secondary.reset(latency)
+    for _ in range(5):
+        result = call()
+    check('4xx is returned without failover', result.get('client_error') and secondary.hits == 0,
+          f'secondary hits {secondary.hits}')
+    check('4xx does not open the circuit', router.snapshot()[0]['circuit'] == 'closed')
+    primary.reset(latency, fail=True, status=429)
+    for _ in range(3):
+        result = call()
+    check('429 counts as a backend failure', router.snapshot()[0]['circuit'] == 'open'
+          and result.get('translatedText') == 'from-secondary')
+
+    print('open circuit')
+    router = use_router(cooldown=2.0)
+    primary.reset(latency, fail=True)
+    secondary.reset(latency)
+    for _ in range(3):
+        call()
+    primary.reset(latency, fail=True)
+    for _ in range(5):
+        result = call()
+    check('open backend is skipped', primary.hits == 0 and result.get('translatedText') == 'from-secondary',
+          f'primary hits {primary.hits}')
+    check('snapshot reports the circuit open', router.snapshot()[0]['circuit'] == 'open')
+    secondary.reset(latency, fail=True)
+    for _ in range(3):
+        call()
+    secondary.reset(latency, fail=True)
+    result = call()
+    check('fails fast when every circuit is open', primary.hits == 0 and secondary.hits == 0 and 'error' in result,
+          result.get('error'))
+
+    print('half-open probe')
+    secondary.reset(latency)
+    router.stats['libretranslate'].record(True, latency)
+    time.sleep(2.1)
+    primary.reset(latency * 4)
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        concurrent = list(pool.map(lambda _: call(), range(10)))
+    check('one probe while half-open', primary.hits == 1, f'primary hits {primary.hits}')
+    check('other calls are served meanwhile', all('error' not in r for r in concurrent))
+    check('successful probe closes the circuit', router.snapshot()[0]['circuit'] == 'closed')
+
+    print('hedging')
+    use_router(hedge=True)
+    primary.reset(latency)
+    secondary.reset(latency)
+    for _ in range(20):
+        call()  # establish the primary's p95
+    primary.reset(latency * 20)
+    start = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - start
+    check('slow primary is hedged', result.get('translatedText') == 'from-secondary' and elapsed < latency * 10,
+          f'{elapsed * 1000:.0f} ms with primary at {latency * 20000:.0f} ms')
+
+    print('concurrency')
+    use_router(hedge=True)
+    primary.reset(latency * 4)
+    secondary.reset(latency * 4)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        concurrent = list(pool.map(lambda _: call(), range(32)))
+    elapsed = time.perf_counter() - start
+    check('32 concurrent calls do not queue behind each other', all('error' not in r for r in concurrent)
+          and elapsed < latency * 4 * 3, f'{elapsed * 1000:.0f} ms at {latency * 4000:.0f} ms per call')
+
+    passed = sum(results)
+    print(f'{passed}/{len(results)} checks passed')
+    sys.exit(0 if passed == len(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
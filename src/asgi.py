@@ -0,0 +1,157 @@
+"""ASGI entry point (async serving mode).
+
+Run with an ASGI server, e.g.:
+
+    uvicorn src.asgi:app --workers 1 --port 5001
+
+The hot read endpoints (GET /api/notes, GET /api/notes/<id>, GET /api/tags) are
+served natively with the async PostgREST client, issuing independent queries
+concurrently so a worker never blocks on the network. Every other route falls
+through to the regular Flask app, run on a pool of ASGI_FALLBACK_THREADS threads
+(default 32) so slow fallback requests don't queue behind each other.
+"""
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+try:
+    from asgiref.sync import sync_to_async
+    from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+except ImportError as e:
+    raise ImportError('The async serving mode needs asgiref and an ASGI server: pip install uvicorn asgiref') from e
+
+from src.main import app as flask_app
+from src.lib.async_supabase_client import async_supabase
+from src.lib.compression import encode_payload
+from src.lib.note_cache import note_cache
+from src.routes.note import assemble_note, assemble_notes, build_note_tags_map, extract_note_tags
+from src.routes.tag import TAG_COLUMNS
+from src.models.tag import Tag
+
+# Threads for requests served by the Flask fallback (writes, translate, export, ...)
+ASGI_FALLBACK_THREADS = int(os.getenv('ASGI_FALLBACK_THREADS', '32'))
+_fallback_executor = ThreadPoolExecutor(max_workers=ASGI_FALLBACK_THREADS, thread_name_prefix='wsgi-fallback')
+
+
+class _PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs the WSGI app thread-sensitively, i.e. every request on one shared
+    # thread; run each on the fallback pool instead, like a threaded WSGI server
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False,
+                                 executor=_fallback_executor)
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _PooledWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+wsgi_app = PooledWsgiToAsgi(flask_app)
+
+
+async def get_notes(query):
+    """Async GET /api/notes: notes, note_tags and tags are fetched concurrently"""
+    tag_filter = query.get('tags', [''])[0]
+    tag_ids = tag_filter.split(',') if tag_filter else []
+
+    notes_query = async_supabase.from_('notes').select('*')
+    note_tags_query = async_supabase.from_('note_tags').select('note_id, tag_id')
+    if tag_ids:
+        tagged = await async_supabase.from_('note_tags').select('note_id').in_('tag_id', tag_ids).execute()
+        if not tagged.data:
+            return 200, []
+        note_ids = list(set(item['note_id'] for item in tagged.data))
+        notes_query = notes_query.in_('id', note_ids)
+        note_tags_query = note_tags_query.in_('note_id', note_ids)
+
+    notes, note_tags, tags = await asyncio.gather(
+        notes_query.order('updated_at', desc=True).execute(),
+        note_tags_query.execute(),
+        async_supabase.from_('tags').select('*').execute()
+    )
+    note_tags_map = build_note_tags_map(note_tags.data, tags.data)
+    return 200, assemble_notes(notes.data, note_tags_map)
+
+
+async def get_note(query, note_id):
+    """Async GET /api/notes/<id>: note row and its tag links are fetched concurrently"""
+    cached = note_cache.get(note_id)
+    if cached is not None:
+        return 200, cached
+    cache_token = note_cache.token(note_id)
+
+    note, note_tags = await asyncio.gather(
+        async_supabase.from_('notes').select('*').eq('id', note_id).execute(),
+        async_supabase.from_('note_tags').select('note_id, tag_id').eq('note_id', note_id).execute()
+    )
+    if not note.data:
+        return 404, {'error': 'Note not found'}
+
+    tag_rows = []
+    tag_ids = list(set(item['tag_id'] for item in note_tags.data or []))
+    if tag_ids:
+        tag_rows = (await async_supabase.from_('tags').select('*').in_('id', tag_ids).execute()).data
+    note_tags_map = build_note_tags_map(note_tags.data, tag_rows)
+
+    result = assemble_note(note.data[0], extract_note_tags(note.data[0], note_tags_map))
+    note_cache.set(note_id, result, cache_token)
+    return 200, result
+
+
+async def get_tags(query):
+    """Async GET /api/tags"""
+    with_counts = query.get('with_counts', [''])[0].lower() in ('1', 'true', 'yes')
+    columns = TAG_COLUMNS + ', note_count' if with_counts else TAG_COLUMNS
+    response = await async_supabase.from_('tags').select(columns).order('name').execute()
+    return 200, [Tag.from_dict(tag).to_dict() for tag in response.data]
+
+
+# (method, pattern, handler); anything else is served by the Flask app
+ASYNC_ROUTES = [
+    ('GET', re.compile(r'^/api/notes$'), get_notes),
+    ('GET', re.compile(r'^/api/notes/(?!(?:export|search)$)([^/]+)$'), get_note),
+    ('GET', re.compile(r'^/api/tags$'), get_tags),
+]
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_supabase.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] == 'http':
+        for method, pattern, handler in ASYNC_ROUTES:
+            match = pattern.match(scope['path'])
+            if match and scope['method'] == method:
+                await _dispatch(scope, send, handler, match.groups())
+                return
+
+    await wsgi_app(scope, receive, send)
+
+
+async def _dispatch(scope, send, handler, args):
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    try:
+        status, payload = await handler(query, *args)
+    except Exception as e:
+        status, payload = 500, {'error': str(e)}
+
+    body, response_headers = encode_payload(payload, headers.get('accept', ''), headers.get('accept-encoding', ''))
+    response_headers.update({
+        'Content-Length': str(len(body)),
+        'Access-Control-Allow-Origin': '*'
+    })
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response_headers.items()]
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,46 @@
+import os
+from src.lib.supabase_client import _MissingSupabaseClient
+
+
+class _LazyAsyncSupabaseClient:
+    """Async PostgREST client for the Supabase database, created on first use.
+
+    supabase-py only ships a sync client, so the async serving mode talks to
+    Supabase's REST endpoint directly through postgrest's AsyncPostgrestClient.
+    It exposes the same `table()`/`from_()` builder API; `execute()` is awaited.
+    The client must be created (first used) inside the serving event loop.
+    """
+    def __init__(self):
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            supabase_url = os.getenv("SUPABASE_URL")
+            supabase_key = os.getenv("SUPABASE_ANON_KEY")
+            if supabase_url and supabase_key:
+                from postgrest import AsyncPostgrestClient
+                self._client = AsyncPostgrestClient(
+                    f"{supabase_url.rstrip('/')}/rest/v1",
+                    headers={
+                        'apiKey': supabase_key,
+                        'Authorization': f'Bearer {supabase_key}',
+                        'Accept': 'application/json',
+                        'Content-Type': 'application/json'
+                    },
+                    timeout=float(os.getenv('SUPABASE_TIMEOUT', '10'))
+                )
+            else:
+                self._client = _MissingSupabaseClient()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+    async def aclose(self):
+        # _MissingSupabaseClient answers every attribute, so hasattr() can't be used
+        if self._client is not None and not isinstance(self._client, _MissingSupabaseClient):
+            await self._client.aclose()
+        self._client = None
+
+
+async_supabase = _LazyAsyncSupabaseClient()
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class BackendStats:
+    """Rolling latency/error statistics and circuit state for one backend"""
+
+    def __init__(self, name: str, window: int = 50, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False  # a half-open probe is in flight
+        self.lock = threading.Lock()
+
+    def record(self, ok: bool, latency: float) -> None:
+        with self.lock:
+            self.probing = False
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+                self.consecutive_failures = 0
+                self.opened_at = None
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= self.failure_threshold:
+                    # (Re)open the circuit; a failed half-open probe restarts the cooldown
+                    self.opened_at = time.monotonic()
+
+    def _half_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at >= self.cooldown
+
+    def available(self) -> bool:
+        """Closed, or half-open with no probe in flight yet"""
+        with self.lock:
+            return self.opened_at is None or (self._half_open() and not self.probing)
+
+    def acquire(self) -> bool:
+        """Claim a call: always granted while closed, once per probe while half-open"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or not self._half_open():
+                return False
+            self.probing = True
+            return True
+
+    def p95(self) -> Optional[float]:
+        with self.lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def error_rate(self) -> float:
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            'name': self.name,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'error_rate': round(self.error_rate(), 3),
+            'samples': len(self.outcomes),
+            'circuit': 'closed' if self.opened_at is None else ('half-open' if self._half_open() else 'open')
+        }
+
+
+class BackendRouter:
+    """Route calls across interchangeable backends.
+
+    Each backend is a callable returning a dict; a dict containing 'error' counts as a
+    failure (the convention used by the translate routes), unless it is also flagged
+    'client_error': the request itself was rejected, so it is returned as is, without
+    failing over or counting against the backend's circuit. Backends are tried in
+    preference order, skipping those with an open circuit; once a circuit's cooldown
+    has passed a single call is let through as a probe. With hedging enabled, a
+    second backend is started once the first one runs past its observed p95 latency
+    and whichever succeeds first wins. A failure falls over to the next backend.
+
+    Every call gets its own small thread pool, so a slow backend or an abandoned
+    hedge only ties up threads belonging to the call that started it.
+    """
+
+    def __init__(self, backends: List[Tuple[str, Callable[..., dict]]], hedge: bool = False,
+                 hedge_min_delay: float = 0.05, hedge_default_delay: float = 2.0,
+                 failure_threshold: int = 3, cooldown: float = 30.0):
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.stats = {
+            name: BackendStats(name, failure_threshold=failure_threshold, cooldown=cooldown)
+            for name, _ in self.backends
+        }
+
+    def _candidates(self) -> List[Tuple[str, Callable[..., dict]]]:
+        return [(name, fn) for name, fn in self.backends if self.stats[name].available()]
+
+    def _run(self, name: str, fn: Callable[..., dict], args, kwargs) -> dict:
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            result = {'error': str(e)}
+        # A client error still means the backend is up and answering
+        ok = isinstance(result, dict) and ('error' not in result or bool(result.get('client_error')))
+        self.stats[name].record(ok, time.monotonic() - start)
+        if not isinstance(result, dict):
+            result = {'error': f'{name} returned an invalid response'}
+        return result
+
+    def _hedge_delay(self, name: str) -> float:
+        p95 = self.stats[name].p95()
+        if p95 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    def call(self, *args, **kwargs) -> dict:
+        if not self.backends:
+            return {'error': 'No translation backend configured'}
+        candidates = self._candidates()
+        if not candidates:
+            return {'error': 'All translation backends are unavailable (circuit open)'}
+        executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix='backend-router')
+        in_flight = {}
+        last_error = {'error': 'All translation backends are unavailable (circuit open)'}
+        next_index = 0
+
+        def launch() -> bool:
+            """Start the next candidate whose circuit grants the call"""
+            nonlocal next_index
+            while next_index < len(candidates):
+                name, fn = candidates[next_index]
+                next_index += 1
+                if self.stats[name].acquire():
+                    in_flight[executor.submit(self._run, name, fn, args, kwargs)] = name
+                    return True
+            return False
+
+        try:
+            launch()
+            while in_flight:
+                timeout = None
+                if self.hedge and next_index < len(candidates) and len(in_flight) == 1:
+                    timeout = self._hedge_delay(next(iter(in_flight.values())))
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than its p95: hedge with the next backend
+                    launch()
+                    continue
+                for future in done:
+                    del in_flight[future]
+                    result = future.result()
+                    if 'error' not in result or result.get('client_error'):
+                        return result
+                    last_error = result
+                if not in_flight:
+                    launch()
+            return last_error
+        finally:
+            # Don't wait for a losing hedge; its thread exits when its request does
+            executor.shutdown(wait=False)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [self.stats[name].to_dict() for name, _ in self.backends]
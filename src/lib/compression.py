@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+import zlib
+from flask import request
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+# Optional encoders: each one is only offered when its package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Environment configuration
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+# Bodies at least this large are compressed and sent in chunks instead of in one piece
+COMPRESS_STREAM_THRESHOLD = int(os.getenv('COMPRESS_STREAM_THRESHOLD', str(1024 * 1024)))
+COMPRESS_CHUNK_SIZE = 64 * 1024
+# Longest time streamed output is held back to batch small chunks together
+COMPRESS_FLUSH_INTERVAL = 0.05
+COMPRESS_LEVEL = {
+    'gzip': int(os.getenv('COMPRESS_GZIP_LEVEL', '6')),
+    'br': int(os.getenv('COMPRESS_BR_LEVEL', '4')),
+    'zstd': int(os.getenv('COMPRESS_ZSTD_LEVEL', '3'))
+}
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'application/msgpack',
+                          'text/csv', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+
+def available_encodings() -> list:
+    """Supported Content-Encodings, most preferred first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+class CompressionMetrics:
+    """Process-wide counters of bytes and CPU time spent per encoding"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_ms': 0.0})
+            stats['responses'] += 1
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            stats['cpu_ms'] += cpu_seconds * 1000
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {}
+            for encoding, stats in self._stats.items():
+                result[encoding] = dict(stats, cpu_ms=round(stats['cpu_ms'], 3))
+                if stats['bytes_in']:
+                    result[encoding]['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3)
+            return result
+
+
+compression_metrics = CompressionMetrics()
+
+
+def _compressor(encoding: str):
+    """Return (compress(chunk) -> bytes, flush() -> bytes, finish() -> bytes) for an encoding"""
+    if encoding == 'zstd':
+        obj = zstandard.ZstdCompressor(level=COMPRESS_LEVEL['zstd']).compressobj()
+        return (obj.compress,
+                lambda: obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                lambda: obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH))
+    if encoding == 'br':
+        obj = brotli.Compressor(quality=COMPRESS_LEVEL['br'])
+        return obj.process, obj.flush, obj.finish
+    # wbits=31 produces a gzip container
+    obj = zlib.compressobj(COMPRESS_LEVEL['gzip'], zlib.DEFLATED, 31)
+    return obj.compress, lambda: obj.flush(zlib.Z_SYNC_FLUSH), obj.flush
+
+
+def _compress_stream(chunks, encoding: str):
+    """Compress an iterable of byte chunks into a stream.
+
+    Small chunks (e.g. one export row each) are buffered up to COMPRESS_CHUNK_SIZE
+    and compressed together, since a sync flush per chunk costs both ratio and CPU.
+    The buffer is flushed early once it has been held for COMPRESS_FLUSH_INTERVAL, or
+    when a chunk was slow to arrive (e.g. import progress lines), so live streams
+    still reach the client promptly.
+    """
+    compress, flush, finish = _compressor(encoding)
+    bytes_in = bytes_out = 0
+    cpu = 0.0
+    buffer = []
+    buffered = 0
+    buffered_since = None
+
+    def drain(final=False):
+        nonlocal bytes_in, bytes_out, cpu, buffered, buffered_since
+        data = b''.join(buffer)
+        buffer.clear()
+        buffered, buffered_since = 0, None
+        start = time.thread_time()
+        out = (compress(data) if data else b'') + (finish() if final else flush())
+        cpu += time.thread_time() - start
+        bytes_in += len(data)
+        bytes_out += len(out)
+        return out
+
+    try:
+        waited_since = time.monotonic()
+        for chunk in chunks:
+            now = time.monotonic()
+            slow = now - waited_since >= COMPRESS_FLUSH_INTERVAL
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                buffer.append(chunk)
+                buffered += len(chunk)
+                if buffered_since is None:
+                    buffered_since = now
+            if buffer and (slow or buffered >= COMPRESS_CHUNK_SIZE
+                           or now - buffered_since >= COMPRESS_FLUSH_INTERVAL):
+                out = drain()
+                if out:
+                    yield out
+            waited_since = time.monotonic()
+        out = drain(final=True)
+        if out:
+            yield out
+    finally:
+        compression_metrics.record(encoding, bytes_in, bytes_out, cpu)
+
+
+def _wants_msgpack() -> bool:
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+
+def _slices(data: bytes):
+    for start in range(0, len(data), COMPRESS_CHUNK_SIZE):
+        yield data[start:start + COMPRESS_CHUNK_SIZE]
+
+
+def negotiate_response(response):
+    """after_request hook: MessagePack via Accept, then gzip/br/zstd via Accept-Encoding"""
+    if response.direct_passthrough or response.status_code < 200 or response.status_code in (204, 304):
+        return response
+
+    if response.mimetype == 'application/json' and not response.is_streamed:
+        response.vary.add('Accept')
+        if _wants_msgpack():
+            response.set_data(msgpack.packb(json.loads(response.get_data()), use_bin_type=True))
+            response.mimetype = 'application/msgpack'
+
+    if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        if len(data) >= COMPRESS_STREAM_THRESHOLD:
+            response.response = _compress_stream(_slices(data), encoding)
+        else:
+            start = time.thread_time()
+            compress, _, finish = _compressor(encoding)
+            compressed = compress(data) + finish()
+            cpu = time.thread_time() - start
+            compression_metrics.record(encoding, len(data), len(compressed), cpu)
+            response.set_data(compressed)
+            response.headers['Server-Timing'] = f'compress;dur={cpu * 1000:.2f}'
+
+    if response.is_streamed:
+        response.headers.pop('Content-Length', None)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def encode_payload(payload, accept: str = '', accept_encoding: str = ''):
+    """Serialize and compress a payload outside of Flask (used by the ASGI mode).
+
+    Applies the same negotiation as `negotiate_response`; returns (body, headers).
+    """
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    best = parse_accept_header(accept, MIMEAccept).best_match(('application/json',) + MSGPACK_MIMETYPES)
+    if msgpack is not None and best in MSGPACK_MIMETYPES:
+        body = msgpack.packb(payload, use_bin_type=True)
+        headers['Content-Type'] = 'application/msgpack'
+    else:
+        body = json.dumps(payload).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+
+    encoding = parse_accept_header(accept_encoding).best_match(available_encodings())
+    if encoding and len(body) >= COMPRESS_MIN_SIZE:
+        start = time.thread_time()
+        compress, _, finish = _compressor(encoding)
+        compressed = compress(body) + finish()
+        cpu = time.thread_time() - start
+        compression_metrics.record(encoding, len(body), len(compressed), cpu)
+        body = compressed
+        headers['Content-Encoding'] = encoding
+        headers['Server-Timing'] = f'compress;dur={cpu * 1000:.2f}'
+    return body, headers
+
+
+def init_compression(app) -> None:
+    app.after_request(negotiate_response)
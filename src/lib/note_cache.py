@@ -0,0 +1,255 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Environment configuration
+NOTE_CACHE_SIZE = int(os.getenv('NOTE_CACHE_SIZE', '256'))  # 0 disables the cache
+NOTE_CACHE_TTL = float(os.getenv('NOTE_CACHE_TTL', '60'))
+# Shared tier: '' for the in-process stand-in, or 'file:<dir>' to share between
+# worker processes on the same host
+NOTE_CACHE_SHARED = os.getenv('NOTE_CACHE_SHARED', '')
+
+
+class LocalSharedStore:
+    """In-process stand-in for a shared key/value tier (e.g. Redis/Memcached).
+
+    Bounded like the real thing: least recently used keys are evicted past
+    `maxsize`, and expired keys are swept at most every `sweep_interval` seconds
+    (keys that are never read again, e.g. after a generation change, would
+    otherwise stay forever). Any replacement only needs get/set/delete with a
+    per-key TTL.
+    """
+
+    def __init__(self, maxsize: int = 4096, sweep_interval: float = 30.0):
+        self.maxsize = maxsize
+        self.sweep_interval = sweep_interval
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now + ttl)
+            self._data.move_to_end(key)
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                for expired in [k for k, (_, expires_at) in self._data.items() if expires_at < now]:
+                    del self._data[expired]
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class FileSharedStore:
+    """Shared tier backed by one JSON file per key, for workers on the same host.
+
+    Each file's mtime is set to its expiry time, so expired entries can be swept
+    with a directory scan (at most every `sweep_interval` seconds, from `set`);
+    past `max_entries` the entries closest to expiring are removed as well.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 10000, sweep_interval: float = 30.0):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace('/', '_').replace(':', '_') + '.json')
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(key)) as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item['expires_at'] < time.time():
+            self.delete(key)
+            return None
+        return item['value']
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'value': value, 'expires_at': expires_at}, f)
+        os.utime(tmp_path, (expires_at, expires_at))
+        os.replace(tmp_path, self._path(key))
+        if time.time() >= self._next_sweep:
+            self.sweep()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def sweep(self) -> None:
+        """Remove expired entries, then the soonest-expiring ones beyond `max_entries`"""
+        now = time.time()
+        self._next_sweep = now + self.sweep_interval
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.json'):
+                        try:
+                            entries.append((entry.stat().st_mtime, entry.path))
+                        except OSError:
+                            pass
+        except OSError:
+            return
+        entries.sort()
+        live = [entry for entry in entries if entry[0] >= now]
+        for _, path in entries[:len(entries) - len(live)] + live[:max(0, len(live) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class NoteCache:
+    """Read-through cache of fully assembled notes.
+
+    Each note's current version (its `updated_at`, plus its invalidation epoch) is
+    recorded in the shared tier; assembled notes are kept in the shared tier, so
+    workers can reuse each other's entries, and in a bounded local LRU keyed by
+    (generation, id, version, epoch) whose entries expire with the same TTL. Writers call
+    `invalidate(note_id)`, or `invalidate_all()` when a change (e.g. a tag rename)
+    can affect many notes.
+
+    Readers take `token(note_id)` before loading a note and pass it to `set`; if the
+    note was invalidated in between, the (possibly stale) note is not cached.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0, shared=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared if shared is not None else LocalSharedStore()
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _generation(self) -> str:
+        generation = self.shared.get('notes:generation')
+        if generation is None:
+            generation = uuid.uuid4().hex
+            self.shared.set('notes:generation', generation, self.ttl)
+        return generation
+
+    def get(self, note_id: str) -> Optional[Dict[str, Any]]:
+        if self.maxsize <= 0:
+            return None
+        generation = self._generation()
+        pointer = self.shared.get(f'note:{generation}:{note_id}:version')
+        if pointer is None:
+            self.misses += 1
+            return None
+        version, epoch = pointer
+
+        # The local key includes everything a refill by another worker can change, so
+        # a local copy is only used while it matches the shared pointer
+        key = (generation, note_id, version, epoch)
+        with self._lock:
+            item = self._local.get(key)
+            if item is not None:
+                note, expires_at = item
+                if expires_at >= time.monotonic():
+                    self._local.move_to_end(key)
+                    self.hits += 1
+                    return note
+                del self._local[key]
+
+        note = self.shared.get(f'note:{generation}:{note_id}:{version}')
+        if note is None:
+            self.misses += 1
+            return None
+        self._store_local(key, note)
+        self.hits += 1
+        return note
+
+    def token(self, note_id: str) -> Tuple[str, Optional[str]]:
+        """Invalidation token for a note; changes whenever the note is invalidated"""
+        generation = self._generation()
+        return generation, self.shared.get(f'note:{generation}:{note_id}:epoch')
+
+    def set(self, note_id: str, note: Dict[str, Any], token: Optional[Tuple[str, Optional[str]]] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        current = self.token(note_id)
+        if token is not None and current != token:
+            return
+        generation, epoch = current
+        version = str(note.get('updated_at', ''))
+        version_key = f'note:{generation}:{note_id}:version'
+        previous = self.shared.get(version_key)
+        self.shared.set(f'note:{generation}:{note_id}:{version}', note, self.ttl)
+        # Tag changes don't touch updated_at, so the pointer also carries the epoch
+        self.shared.set(version_key, [version, epoch], self.ttl)
+        if previous is not None and previous[0] != version:
+            self.shared.delete(f'note:{generation}:{note_id}:{previous[0]}')
+        if token is not None and self.token(note_id) != token:
+            # Invalidated while we were writing: don't leave the stale note current
+            self.shared.delete(version_key)
+            return
+        self._store_local((generation, note_id, version, epoch), note)
+
+    def _store_local(self, key, note: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local[key] = (note, time.monotonic() + self.ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def invalidate(self, note_id: str) -> None:
+        generation = self._generation()
+        self.shared.set(f'note:{generation}:{note_id}:epoch', uuid.uuid4().hex, self.ttl)
+        pointer = self.shared.get(f'note:{generation}:{note_id}:version')
+        self.shared.delete(f'note:{generation}:{note_id}:version')
+        if pointer is not None:
+            self.shared.delete(f'note:{generation}:{note_id}:{pointer[0]}')
+        with self._lock:
+            for key in [key for key in self._local if key[1] == note_id]:
+                del self._local[key]
+
+    def invalidate_all(self) -> None:
+        self.shared.set('notes:generation', uuid.uuid4().hex, self.ttl)
+        with self._lock:
+            self._local.clear()
+
+
+def build_note_cache() -> NoteCache:
+    # Each cached note takes up to three shared keys (body, version pointer, epoch)
+    max_entries = max(NOTE_CACHE_SIZE, 1) * 4
+    if NOTE_CACHE_SHARED.startswith('file:'):
+        shared = FileSharedStore(NOTE_CACHE_SHARED[len('file:'):], max_entries=max_entries)
+    else:
+        shared = LocalSharedStore(maxsize=max_entries)
+    return NoteCache(maxsize=NOTE_CACHE_SIZE, ttl=NOTE_CACHE_TTL, shared=shared)
+
+
+note_cache = build_note_cache()
@@ -0,0 +1,347 @@
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+_TOKEN = re.compile(r'\w{2,}', re.UNICODE)
+
+
+def tokenize(text: str) -> Dict[str, int]:
+    """Term counts for a piece of text"""
+    counts = {}
+    for token in _TOKEN.findall((text or '').lower()):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+class RelatedNotesIndex:
+    """Incrementally updated TF-IDF index over note title + content.
+
+    Rows hold sublinear term frequencies (1 + log tf). Most rows live in a compacted
+    matrix kept both as CSC (`main`, the inverted index used for scoring) and CSR
+    (`main_rows`, to look up a note's own terms), memory-mapped from disk when
+    loaded. Recent inserts go to a small `delta`; `upsert` never merges; the owner
+    of the index calls `merge()` (e.g. from a background thread) once
+    `needs_merge()`. Updated and deleted notes are tombstoned and dropped at the
+    next merge. Cosine similarity is computed against the posting lists of the
+    query note's terms only, so a query touches a small part of the matrix.
+
+    Document frequencies only grow between merges and row norms are computed with
+    the idf at insert/merge time, so scores drift slightly until the next merge.
+
+    `versions` records the `updated_at` each note was indexed at, so re-reading an
+    unchanged note is a no-op. `cursor` is the (updated_at, id) of the last note
+    read from the database by a catch-up scan; it is set with `advance()` and saved
+    with the index.
+    """
+
+    def __init__(self, directory: Optional[str] = None, delta_max: int = 1000, max_query_terms: int = 32):
+        self.directory = directory
+        self.delta_max = delta_max
+        # Only the highest-weighted terms of a query note are scored; frequent,
+        # low-idf terms have long posting lists but barely move the ranking
+        self.max_query_terms = max_query_terms
+        self._bulk = False
+        self.lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self.vocab: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.versions: Dict[str, str] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.df = np.zeros(0, dtype=np.int64)
+        self.main = sparse.csc_matrix((0, 0), dtype=np.float32)
+        self.main_rows = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.delta: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._delta_matrix = None
+        self.cursor: Tuple[str, str] = ('', '')
+
+    # -- building -------------------------------------------------------------
+
+    def _vectorize(self, text: str, grow: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        counts = tokenize(text)
+        cols, weights = [], []
+        for term, count in counts.items():
+            col = self.vocab.get(term)
+            if col is None:
+                if not grow:
+                    continue
+                col = self.vocab[term] = len(self.vocab)
+            cols.append(col)
+            weights.append(1 + math.log(count))
+        order = np.argsort(cols)
+        return np.asarray(cols, dtype=np.int64)[order], np.asarray(weights, dtype=np.float32)[order]
+
+    def _idf(self) -> np.ndarray:
+        n = max(int(self.alive.sum()), 1)
+        df = np.zeros(len(self.vocab), dtype=np.float64)
+        df[:len(self.df)] = self.df
+        return (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+
+    def _grow(self, n_rows: int) -> None:
+        if n_rows > len(self.alive):
+            capacity = max(n_rows, 2 * len(self.alive), 1024)
+            self.alive = np.concatenate([self.alive, np.zeros(capacity - len(self.alive), dtype=bool)])
+            self.norms = np.concatenate([self.norms, np.zeros(capacity - len(self.norms), dtype=np.float32)])
+        if len(self.vocab) > len(self.df):
+            self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype=np.int64)])
+
+    def upsert(self, note_id: str, text: str, updated_at: Optional[str] = None) -> bool:
+        """Index a note; returns False (and does nothing) if this version is already indexed"""
+        with self.lock:
+            note_id = str(note_id)
+            if updated_at and note_id in self.rows and self.versions.get(note_id) == updated_at:
+                return False
+            if note_id in self.rows:
+                self.alive[self.rows[note_id]] = False
+            cols, weights = self._vectorize(text)
+            row = len(self.ids)
+            self.ids.append(note_id)
+            self.rows[note_id] = row
+            self._grow(row + 1)
+            self.df[cols] += 1
+            if not self._bulk:
+                # During bulk loads merge() computes every norm in one pass instead
+                idf = self._idf()
+                self.norms[row] = np.linalg.norm(weights * idf[cols]) if len(cols) else 0.0
+            self.alive[row] = True
+            if updated_at:
+                self.versions[note_id] = updated_at
+            self.delta.append((cols, weights))
+            self._delta_matrix = None
+            return True
+
+    def needs_merge(self) -> bool:
+        return len(self.delta) >= self.delta_max
+
+    def remove(self, note_id: str) -> None:
+        with self.lock:
+            self.versions.pop(str(note_id), None)
+            row = self.rows.pop(str(note_id), None)
+            if row is not None:
+                self.alive[row] = False
+
+    def advance(self, updated_at: str, note_id: str) -> None:
+        """Move the catch-up cursor past a note read from the database"""
+        with self.lock:
+            if (updated_at, str(note_id)) > self.cursor:
+                self.cursor = (updated_at, str(note_id))
+
+    def bulk_load(self, notes) -> int:
+        """Index an iterable of (id, text, updated_at) and merge once at the end.
+
+        Returns the number of notes indexed; nothing is merged or saved if that is 0.
+        """
+        applied = 0
+        with self.lock:
+            self._bulk = True
+            try:
+                for note_id, text, updated_at in notes:
+                    applied += self.upsert(note_id, text, updated_at)
+            finally:
+                self._bulk = False
+                # Also after a failure part way, so the rows read so far get norms
+                if applied:
+                    self.merge()
+        return applied
+
+    def _delta_csr(self) -> sparse.csr_matrix:
+        if self._delta_matrix is None:
+            indptr = np.zeros(len(self.delta) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(cols) for cols, _ in self.delta])
+            indices = np.concatenate([cols for cols, _ in self.delta]) if self.delta else np.zeros(0, dtype=np.int64)
+            data = np.concatenate([w for _, w in self.delta]) if self.delta else np.zeros(0, dtype=np.float32)
+            self._delta_matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(self.delta), len(self.vocab)))
+        return self._delta_matrix
+
+    def merge(self) -> None:
+        """Fold the delta into `main`, drop tombstoned rows, refresh df/norms and save.
+
+        The new matrices are built from a snapshot without holding `lock`, so queries
+        and upserts carry on meanwhile; rows upserted during the merge stay in the
+        delta and rows tombstoned during it are dropped by the next merge.
+        """
+        with self._merge_lock:
+            with self.lock:
+                n_rows, n_delta = len(self.ids), len(self.delta)
+                main_rows, delta = self.main_rows, self._delta_csr()
+                keep = np.flatnonzero(self.alive[:n_rows])
+                ids, versions, vocab, cursor = self.ids[:n_rows], dict(self.versions), dict(self.vocab), self.cursor
+
+            main = sparse.csr_matrix(main_rows, copy=True)
+            main.resize((main.shape[0], delta.shape[1]))
+            merged_rows = sparse.vstack([main, delta], format='csr')[keep]
+            merged_rows.sort_indices()
+            merged = merged_rows.tocsc()
+            merged.sort_indices()
+            df = np.diff(merged.indptr).astype(np.int64)
+            norms = self._row_norms(merged, df, len(keep))
+            ids = [ids[row] for row in keep]
+            rows = {note_id: row for row, note_id in enumerate(ids)}
+            terms = [None] * merged.shape[1]
+            for term, col in vocab.items():
+                if col < len(terms):
+                    terms[col] = term
+
+            # Only the changes made since the snapshot are applied under the lock
+            with self.lock:
+                alive = self.alive[:len(self.ids)]
+                tail_ids = self.ids[n_rows:]
+                self.alive = np.concatenate([alive[keep], alive[n_rows:]])
+                for row in np.flatnonzero(~self.alive[:len(ids)]):
+                    if rows.get(ids[row]) == row:
+                        del rows[ids[row]]
+                for offset, note_id in enumerate(tail_ids):
+                    if self.alive[len(ids) + offset]:
+                        rows[note_id] = len(ids) + offset
+                self.ids = ids + tail_ids
+                self.rows = rows
+                self.norms = np.concatenate([norms, self.norms[n_rows:len(alive)]])
+                self.main_rows, self.main = merged_rows, merged
+                self.delta = self.delta[n_delta:]
+                self._delta_matrix = None
+                self.df = np.zeros(len(self.vocab), dtype=np.int64)
+                self.df[:len(df)] = df
+                for cols, _ in self.delta:
+                    self.df[cols] += 1
+
+            # Saved as of the snapshot, so the cursor never runs ahead of the saved rows
+            self._write(merged, merged_rows, norms, terms, ids, [versions.get(note_id) for note_id in ids], cursor)
+
+    @staticmethod
+    def _row_norms(main: sparse.csc_matrix, df: np.ndarray, n: int) -> np.ndarray:
+        idf = np.log((1 + max(n, 1)) / (1 + df.astype(np.float64))) + 1
+        squared = main.multiply(main).tocsr() @ (idf ** 2)
+        return np.sqrt(squared).astype(np.float32)
+
+    # -- querying -------------------------------------------------------------
+
+    def related(self, note_id: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (note_id, cosine score) most similar to an indexed note"""
+        with self.lock:
+            row = self.rows.get(str(note_id))
+            if row is None:
+                return []
+            n_main = self.main.shape[0]
+            if row < n_main:
+                start, end = self.main_rows.indptr[row], self.main_rows.indptr[row + 1]
+                cols = np.asarray(self.main_rows.indices[start:end], dtype=np.int64)
+                weights = np.asarray(self.main_rows.data[start:end], dtype=np.float32)
+            else:
+                cols, weights = self.delta[row - n_main]
+            return self._query(cols, weights, k, exclude=row)
+
+    def similar_to_text(self, text: str, k: int = 10) -> List[Tuple[str, float]]:
+        with self.lock:
+            cols, weights = self._vectorize(text, grow=False)
+            return self._query(cols, weights, k)
+
+    def _query(self, cols: np.ndarray, weights: np.ndarray, k: int, exclude: Optional[int] = None):
+        n_rows = len(self.ids)
+        if not len(cols) or not n_rows:
+            return []
+        idf = self._idf()
+        q = weights * idf[cols]
+        q_norm = np.linalg.norm(q)
+        if q_norm == 0:
+            return []
+        if len(cols) > self.max_query_terms:
+            keep = np.sort(np.argpartition(-q, self.max_query_terms - 1)[:self.max_query_terms])
+            cols, q = cols[keep], q[keep]
+        term_weights = q * idf[cols]
+
+        scores = np.zeros(n_rows, dtype=np.float32)
+        n_main = self.main.shape[0]
+        # Terms added after the last merge have no column in `main` yet
+        in_main = cols < self.main.shape[1]
+        if n_main and in_main.any():
+            scores[:n_main] = self.main[:, cols[in_main]] @ term_weights[in_main]
+        if self.delta:
+            delta = self._delta_csr()
+            dense = np.zeros(delta.shape[1], dtype=np.float32)
+            dense[cols] = term_weights
+            scores[n_main:] = delta @ dense
+
+        norms = self.norms[:n_rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(norms > 0, scores / (norms * q_norm), 0)
+        scores[~self.alive[:n_rows]] = -1
+        if exclude is not None:
+            scores[exclude] = -1
+
+        k = min(k, n_rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top if scores[row] > 0]
+
+    # -- persistence ----------------------------------------------------------
+
+    def save(self) -> None:
+        """Merge pending changes and write the index to `directory`"""
+        self.merge()
+
+    def _write(self, main, main_rows, norms, vocab, ids, versions, cursor) -> None:
+        """Replace `directory` atomically; failures are logged, the in-memory index is unaffected"""
+        if not self.directory:
+            return
+        tmp_dir = None
+        try:
+            parent = os.path.dirname(os.path.abspath(self.directory))
+            os.makedirs(parent, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(dir=parent)
+            for prefix, matrix in (('csc', main), ('csr', main_rows)):
+                for name in ('data', 'indices', 'indptr'):
+                    np.save(os.path.join(tmp_dir, f'{prefix}_{name}.npy'), np.asarray(getattr(matrix, name)))
+            np.save(os.path.join(tmp_dir, 'norms.npy'), np.asarray(norms))
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({'ids': ids, 'vocab': vocab, 'shape': list(main.shape),
+                           'versions': versions, 'cursor': list(cursor)}, f)
+            old_dir = None
+            if os.path.exists(self.directory):
+                old_dir = tempfile.mkdtemp(dir=parent)
+                os.rename(self.directory, os.path.join(old_dir, 'index'))
+            os.rename(tmp_dir, self.directory)
+            if old_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except OSError as e:
+            print(f"Error saving related-notes index to {self.directory}: {str(e)}")
+            if tmp_dir and os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str, delta_max: int = 1000) -> 'RelatedNotesIndex':
+        """Open a saved index with its arrays memory-mapped (empty index if none saved)"""
+        index = cls(directory, delta_max)
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return index
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        def mmap(name):
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+
+        shape = tuple(meta['shape'])
+        index.main = sparse.csc_matrix((mmap('csc_data'), mmap('csc_indices'), mmap('csc_indptr')),
+                                       shape=shape, copy=False)
+        index.main_rows = sparse.csr_matrix((mmap('csr_data'), mmap('csr_indices'), mmap('csr_indptr')),
+                                            shape=shape, copy=False)
+        index.norms = np.array(mmap('norms'))
+        index.vocab = {term: col for col, term in enumerate(meta['vocab'])}
+        index.ids = meta['ids']
+        index.rows = {note_id: row for row, note_id in enumerate(index.ids)}
+        index.alive = np.ones(len(index.ids), dtype=bool)
+        index.df = np.diff(np.asarray(index.main.indptr)).astype(np.int64)
+        index.versions = {
+            note_id: version for note_id, version in zip(index.ids, meta.get('versions', [])) if version
+        }
+        index.cursor = tuple(meta.get('cursor', ('', '')))
+        return index
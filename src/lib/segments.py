@@ -0,0 +1,35 @@
+import hashlib
+import re
+from typing import List, Tuple
+
+# Paragraphs longer than this are further split on sentence boundaries
+MAX_SEGMENT_CHARS = 1500
+
+_PARAGRAPH_BREAK = re.compile(r'(\n\s*\n)')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?。！？])(\s+)')
+
+
+def split_segments(text: str) -> List[Tuple[str, bool]]:
+    """Split text into an ordered list of ``(piece, translatable)`` tuples.
+
+    Whitespace between paragraphs/sentences is kept as non-translatable pieces so
+    that ``''.join(piece for piece, _ in segments) == text``.
+    """
+    segments = []
+    for part in _PARAGRAPH_BREAK.split(text or ''):
+        if not part:
+            continue
+        if not part.strip():
+            segments.append((part, False))
+        elif len(part) <= MAX_SEGMENT_CHARS:
+            segments.append((part, True))
+        else:
+            for piece in _SENTENCE_BREAK.split(part):
+                if piece:
+                    segments.append((piece, bool(piece.strip())))
+    return segments
+
+
+def segment_hash(text: str) -> str:
+    """Stable key for a segment's source text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -1,15 +1,10 @@
-from supabase import create_client
 import os
-from dotenv import load_dotenv
+import threading
 
-# Load environment variables from a local .env during development.
+# Environment variables are loaded by src/main.py (from a local .env during development).
 # In production (Vercel) environment variables should be set in the project settings
 # and no .env file will be present. We avoid raising during import so serverless
 # functions don't crash at startup if env vars aren't configured.
-load_dotenv()
-
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_ANON_KEY")
 
 
 class _MissingSupabaseClient:
@@ -27,9 +22,33 @@ class _MissingSupabaseClient:
         return _raise
 
 
-if supabase_url and supabase_key:
-    supabase = create_client(supabase_url, supabase_key)
-else:
-    # Do not raise here — allow the app to start and return informative errors when
-    # a route actually tries to use Supabase.
-    supabase = _MissingSupabaseClient()
\ No newline at end of file
+class _LazySupabaseClient:
+    """Creates the real Supabase client on first use.
+
+    Importing `supabase` (and the HTTP stack under it) is deferred until a route
+    actually queries the database, which keeps it off the cold-start path.
+    """
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    supabase_url = os.getenv("SUPABASE_URL")
+                    supabase_key = os.getenv("SUPABASE_ANON_KEY")
+                    if supabase_url and supabase_key:
+                        from supabase import create_client
+                        self._client = create_client(supabase_url, supabase_key)
+                    else:
+                        # Do not raise here — allow the app to start and return informative
+                        # errors when a route actually tries to use Supabase.
+                        self._client = _MissingSupabaseClient()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+
+supabase = _LazySupabaseClient()
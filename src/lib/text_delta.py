@@ -0,0 +1,50 @@
+from typing import Any, Dict, List
+
+
+def _is_int(value: Any) -> bool:
+    # bool is a subclass of int, but true/false are never valid offsets
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _splits_pair(units: bytes, index: int) -> bool:
+    """True if a UTF-16 offset falls between the two halves of a surrogate pair"""
+    if index <= 0 or index * 2 >= len(units):
+        return False
+    unit = int.from_bytes(units[index * 2:index * 2 + 2], 'little')
+    return 0xDC00 <= unit <= 0xDFFF
+
+
+def apply_delta(text: str, ops: List[Dict[str, Any]]) -> str:
+    """Apply a list of splice operations to ``text`` and return the result.
+
+    Each op is a dict ``{"pos": int, "del": int (optional), "ins": str (optional)}``
+    describing a splice at ``pos``: remove ``del`` characters and insert ``ins``.
+    ``pos`` and ``del`` count UTF-16 code units, like JavaScript string offsets, so a
+    character outside the Basic Multilingual Plane (e.g. an emoji) counts as 2.
+    Ops are applied in order, so each ``pos`` refers to the text as produced by
+    the previous op. Raises ValueError for malformed or out-of-range ops, or ops
+    that would split a surrogate pair.
+    """
+    if not isinstance(ops, list):
+        raise ValueError('Delta must be a list of operations')
+
+    units = text.encode('utf-16-le')
+    for op in ops:
+        if not isinstance(op, dict) or 'pos' not in op:
+            raise ValueError('Each operation needs a "pos"')
+        pos = op['pos']
+        delete = op.get('del', 0)
+        insert = op.get('ins', '')
+        if not _is_int(pos) or not _is_int(delete) or not isinstance(insert, str):
+            raise ValueError('Invalid operation types')
+        if pos < 0 or delete < 0 or (pos + delete) * 2 > len(units):
+            raise ValueError(f'Operation out of range: {op}')
+        if _splits_pair(units, pos) or _splits_pair(units, pos + delete):
+            raise ValueError(f'Operation splits a surrogate pair: {op}')
+        try:
+            inserted = insert.encode('utf-16-le')
+        except UnicodeEncodeError:
+            raise ValueError(f'Operation inserts an unpaired surrogate: {op}')
+        units = units[:pos * 2] + inserted + units[(pos + delete) * 2:]
+
+    return units.decode('utf-16-le')
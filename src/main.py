@@ -1,51 +1,107 @@
 import os
+import re
 import sys
+import threading
+from importlib import import_module
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables (once, for every module imported later on)
 load_dotenv()
 
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS
-from src.routes.user import user_bp
-from src.routes.note import note_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
-
-# Enable CORS for all routes
-CORS(app)
-
-# register blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(note_bp, url_prefix='/api')
-
-# Import and register tag blueprint
-from src.routes.tag import tag_bp
-app.register_blueprint(tag_bp, url_prefix='/api')
-
-# Import and register translation blueprint
-from src.routes.translate import translate_bp
-app.register_blueprint(translate_bp, url_prefix='/api')
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+from src.lib.compression import compression_metrics, init_compression
+
+# Route modules are imported on the first request that needs them, so a cold
+# start only pays for e.g. supabase/httpx or SQLAlchemy when those routes are hit.
+# Order matters: the first matching pattern wins.
+LAZY_BLUEPRINTS = [
+    (re.compile(r'^/api/users(/|$)'), 'src.routes.user', 'user_bp'),
+    (re.compile(r'^/api/(tags(/|$)|notes/[^/]+/tags(/|$))'), 'src.routes.tag', 'tag_bp'),
+    (re.compile(r'^/api/(translate(/|$)|notes/[^/]+/translate$)'), 'src.routes.translate', 'translate_bp'),
+    (re.compile(r'^/api/notes(/|$)'), 'src.routes.note', 'note_bp'),
+]
+
+
+def create_app(blueprints=None, serve_static=True):
+    """Build a Flask app with the shared configuration.
+
+    `blueprints` is a list of (module path, attribute) pairs registered under /api.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
+
+    # Enable CORS for all routes; custom response headers must be exposed for
+    # browser clients to read them (e.g. the /api/users pagination cursor)
+    CORS(app, expose_headers=['X-Next-After-Id'])
+
+    # MessagePack (via Accept) and gzip/br/zstd (via Accept-Encoding) for API responses
+    init_compression(app)
+
+    for module_path, attr in blueprints or []:
+        app.register_blueprint(getattr(import_module(module_path), attr), url_prefix='/api')
+
+    if serve_static:
+        @app.route('/api/metrics/compression')
+        def get_compression_metrics():
+            """Bytes in/out and CPU time spent compressing, per encoding, for this process"""
+            return jsonify(compression_metrics.snapshot())
+
+        @app.route('/', defaults={'path': ''})
+        @app.route('/<path:path>')
+        def serve(path):
+            static_folder_path = app.static_folder
+            if static_folder_path is None:
+                    return "Static folder not configured", 404
+
+            if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+                return send_from_directory(static_folder_path, path)
+            else:
+                index_path = os.path.join(static_folder_path, 'index.html')
+                if os.path.exists(index_path):
+                    return send_from_directory(static_folder_path, 'index.html')
+                else:
+                    return "index.html not found", 404
+
+    return app
+
+
+class LazyBlueprintDispatcher:
+    """WSGI middleware that sends API requests to per-blueprint apps built on first use.
+
+    Requests that match no entry in LAZY_BLUEPRINTS fall through to the wrapped app
+    (static files / index.html).
+    """
+
+    def __init__(self, default_app, routes):
+        self.default_app = default_app
+        self.routes = routes
+        self.apps = {}
+        self.lock = threading.Lock()
+
+    def get_app(self, module_path, attr):
+        app = self.apps.get(module_path)
+        if app is None:
+            with self.lock:
+                app = self.apps.get(module_path)
+                if app is None:
+                    app = create_app([(module_path, attr)], serve_static=False)
+                    self.apps[module_path] = app
+        return app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for pattern, module_path, attr in self.routes:
+            if pattern.match(path):
+                return self.get_app(module_path, attr)(environ, start_response)
+        return self.default_app(environ, start_response)
+
+
+app = create_app()
+app.wsgi_app = LazyBlueprintDispatcher(app.wsgi_app, LAZY_BLUEPRINTS)
 
 
 if __name__ == '__main__':
@@ -2,11 +2,12 @@ from datetime import datetime
 from typing import Dict, Any, List, Optional
 
 class Tag:
-    def __init__(self, id: str, name: str, color: str = '#6B73FF', created_at: Optional[str] = None):
+    def __init__(self, id: str, name: str, color: str = '#6B73FF', created_at: Optional[str] = None, note_count: Optional[int] = None):
         self.id = id
         self.name = name
         self.color = color
         self.created_at = created_at or datetime.utcnow().isoformat()
+        self.note_count = note_count
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> 'Tag':
@@ -14,13 +15,17 @@ class Tag:
             id=str(data.get('id')),
             name=data.get('name', ''),
             color=data.get('color', '#6B73FF'),
-            created_at=data.get('created_at', datetime.utcnow().isoformat())
+            created_at=data.get('created_at', datetime.utcnow().isoformat()),
+            note_count=data.get('note_count')
         )
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        data = {
             'id': self.id,
             'name': self.name,
             'color': self.color,
             'created_at': self.created_at
-        }
\ No newline at end of file
+        }
+        if self.note_count is not None:
+            data['note_count'] = self.note_count
+        return data
\ No newline at end of file
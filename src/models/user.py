@@ -1,7 +1,10 @@
+import os
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db')
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -16,3 +19,37 @@ class User(db.Model):
             'username': self.username,
             'email': self.email
         }
+
+def init_db(app):
+    """Bind `db` to the app with engine and connection pool settings from the environment.
+
+    Environment variables:
+      DATABASE_URL - SQLAlchemy URL (default: SQLite file in src/database/app.db)
+      DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE - pool tuning
+        (ignored for SQLite)
+    """
+    database_url = os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
+    # Heroku/Supabase style URLs use the deprecated postgres:// scheme
+    if database_url.startswith('postgres://'):
+        database_url = 'postgresql://' + database_url[len('postgres://'):]
+
+    # Validate pooled connections before use so dropped connections don't fail requests
+    engine_options = {'pool_pre_ping': True}
+    if database_url.startswith('sqlite'):
+        if database_url.startswith('sqlite:///') and ':memory:' not in database_url:
+            os.makedirs(os.path.dirname(database_url[len('sqlite:///'):]) or '.', exist_ok=True)
+    else:
+        engine_options.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+            'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800'))
+        })
+
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_url)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options)
+    app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
@@ -1,9 +1,27 @@
-from flask import Blueprint, jsonify, request
+import csv
+import io
+import json
+import os
+import threading
+import time
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from src.models.note import Note
 from src.lib.supabase_client import supabase
+from src.lib.text_delta import apply_delta
+from src.lib.note_cache import note_cache
 
 note_bp = Blueprint('note', __name__)
 
+# Related-notes index (loaded on first use; numpy/scipy are only imported then)
+RELATED_INDEX_DIR = os.getenv('RELATED_INDEX_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'related_index'))
+RELATED_CATCHUP_INTERVAL = float(os.getenv('RELATED_CATCHUP_INTERVAL', '60'))
+RELATED_CATCHUP_PAGE_SIZE = 1000
+MAX_RELATED = 50
+_related_index = None
+_related_index_lock = threading.Lock()
+_related_refreshing = False
+_related_checked_at = None
+
 def get_note_tags(note_id=None):
     """Helper function to get tags for notes"""
     try:
@@ -22,19 +40,7 @@ def get_note_tags(note_id=None):
         # Get all the tags
         tags_result = supabase.from_('tags').select('*').in_('id', tag_ids).execute()
         
-        # Create a map of tag_id to tag data
-        tag_map = {tag['id']: tag for tag in tags_result.data}
-        
-        # Create the final note_tags_map
-        note_tags_map = {}
-        for item in note_tags_result.data:
-            note_id = item['note_id']
-            tag_id = item['tag_id']
-            if note_id not in note_tags_map:
-                note_tags_map[note_id] = []
-            if tag_id in tag_map:
-                note_tags_map[note_id].append(tag_map[tag_id])
-        
+        note_tags_map = build_note_tags_map(note_tags_result.data, tags_result.data)
         print(f"Note tags map: {note_tags_map}")  # Debug log
         return note_tags_map
     except Exception as e:
@@ -43,6 +49,90 @@ def get_note_tags(note_id=None):
         print(traceback.format_exc())  # Print full stack trace
         return {}
 
+def build_note_tags_map(note_tag_rows, tag_rows):
+    """Map note_id -> list of tag dicts from note_tags rows and tag rows"""
+    # Create a map of tag_id to tag data
+    tag_map = {tag['id']: tag for tag in tag_rows or []}
+
+    # Create the final note_tags_map
+    note_tags_map = {}
+    for item in note_tag_rows or []:
+        note_id = item['note_id']
+        tag_id = item['tag_id']
+        if note_id not in note_tags_map:
+            note_tags_map[note_id] = []
+        if tag_id in tag_map:
+            note_tags_map[note_id].append(tag_map[tag_id])
+    return note_tags_map
+
+def extract_note_tags(note_data, note_tags_map):
+    """Tags for a note: from the helper map if present, else from nested select data"""
+    note_id = note_data.get('id')
+    # First try the helper mapping (works even if nested selects are restricted)
+    if note_tags_map and note_id in note_tags_map:
+        return note_tags_map.get(note_id, [])
+
+    # Fallback: parse nested structures returned by Supabase
+    tags = []
+    # try 'note_tags' structure
+    if 'note_tags' in note_data and note_data['note_tags']:
+        for nt in note_data['note_tags']:
+            if nt and isinstance(nt, dict) and 'tag' in nt and nt['tag']:
+                tags.append(nt['tag'])
+    # try 'tags' structure (older aliasing)
+    elif 'tags' in note_data and note_data['tags']:
+        # 'tags' may be an array of note_tag objects with nested 'tag' or direct tag dicts
+        for t in note_data['tags']:
+            if isinstance(t, dict):
+                if 'tag' in t and t['tag']:
+                    tags.append(t['tag'])
+                elif 'id' in t:
+                    tags.append(t)
+    return tags
+
+def assemble_note(note_data, tags):
+    """Build the API representation of a note row with its tags"""
+    processed_note_data = {
+        'id': note_data.get('id'),
+        'title': note_data.get('title', ''),
+        'content': note_data.get('content', ''),
+        'created_at': note_data.get('created_at', ''),
+        'updated_at': note_data.get('updated_at', ''),
+        'tags': tags,
+        'event_date': note_data.get('event_date'),
+        'event_time': note_data.get('event_time')
+    }
+    return Note.from_dict(processed_note_data).to_dict()
+
+def assemble_notes(note_rows, note_tags_map):
+    """Format note rows for the API, skipping duplicates and notes that fail to process"""
+    notes_data = []
+    seen_notes = set()  # To handle potential duplicates from the join
+
+    for note_data in note_rows or []:
+        try:
+            # Skip if we've already processed this note
+            note_id = note_data.get('id')
+            if note_id in seen_notes:
+                continue
+            seen_notes.add(note_id)
+
+            print(f"\nProcessing note: {note_id}")  # Debug log
+            print(f"Note data keys: {list(note_data.keys())}")  # Debug log
+
+            tags = extract_note_tags(note_data, note_tags_map)
+            print(f"Final tags list for note {note_id}: {tags}")
+
+            notes_data.append(assemble_note(note_data, tags))
+
+        except Exception as e:
+            print(f"Error processing note {note_data.get('id')}: {str(e)}")  # For debugging
+            import traceback
+            print(traceback.format_exc())
+            continue  # Skip this note if there's an error
+
+    return notes_data
+
 @note_bp.route('/notes', methods=['GET'])
 def get_notes():
     """Get all notes with their tags, ordered by most recently updated"""
@@ -104,73 +194,11 @@ def get_notes():
                 print("note_tags data:", note['note_tags'])
         print("==============================\n")
         
-        # Process the response to format tags correctly
-        notes_data = []
-        seen_notes = set()  # To handle potential duplicates from the join
-
         # Try to fetch tag associations using the helper (avoids nested select issues / RLS)
         note_tags_map = get_note_tags()
         print("Note tags map from helper:", note_tags_map)
 
-        for note_data in response.data:
-            try:
-                # Skip if we've already processed this note
-                note_id = note_data.get('id')
-                if note_id in seen_notes:
-                    continue
-                seen_notes.add(note_id)
-
-                print(f"\nProcessing note: {note_id}")  # Debug log
-                print(f"Note data keys: {list(note_data.keys())}")  # Debug log
-
-                # First try the helper mapping (works even if nested selects are restricted)
-                tags = []
-                if note_tags_map and note_id in note_tags_map:
-                    tags = note_tags_map.get(note_id, [])
-                    print(f"Using helper tags for {note_id}: {tags}")
-                else:
-                    # Fallback: try to parse nested structures returned by Supabase
-                    print("Helper map missing or empty for this note; falling back to nested parsing")
-                    # try 'note_tags' structure
-                    if 'note_tags' in note_data and note_data['note_tags']:
-                        for nt in note_data['note_tags']:
-                            if nt and isinstance(nt, dict) and 'tag' in nt and nt['tag']:
-                                tags.append(nt['tag'])
-                    # try 'tags' structure (older aliasing)
-                    elif 'tags' in note_data and note_data['tags']:
-                        # 'tags' may be an array of note_tag objects with nested 'tag' or direct tag dicts
-                        for t in note_data['tags']:
-                            if isinstance(t, dict):
-                                if 'tag' in t and t['tag']:
-                                    tags.append(t['tag'])
-                                elif 'id' in t:
-                                    tags.append(t)
-
-                print(f"Final tags list for note {note_id}: {tags}")
-
-                # Create the complete note data
-                processed_note_data = {
-                    'id': note_data.get('id'),
-                    'title': note_data.get('title', ''),
-                    'content': note_data.get('content', ''),
-                    'created_at': note_data.get('created_at', ''),
-                    'updated_at': note_data.get('updated_at', ''),
-                    'tags': tags,
-                    'event_date': note_data.get('event_date'),
-                    'event_time': note_data.get('event_time')
-                }
-
-                print(f"Processed note data: {processed_note_data}")  # Debug log
-                note = Note.from_dict(processed_note_data)
-                notes_data.append(note.to_dict())
-
-            except Exception as e:
-                print(f"Error processing note {note_data.get('id')}: {str(e)}")  # For debugging
-                import traceback
-                print(traceback.format_exc())
-                continue  # Skip this note if there's an error
-
-        return jsonify(notes_data)
+        return jsonify(assemble_notes(response.data, note_tags_map))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -199,6 +227,7 @@ def create_note():
             return jsonify({'error': 'Failed to create note'}), 500
             
         note_id = response.data[0]['id']
+        _index_note(response.data[0])
         
         # If tags are provided, create the note-tag associations
         if 'tags' in data and isinstance(data['tags'], list):
@@ -232,6 +261,12 @@ def create_note():
 def get_note(note_id):
     """Get a specific note by ID"""
     try:
+        cached = note_cache.get(note_id)
+        if cached is not None:
+            return jsonify(cached)
+        # Taken before the read so a concurrent update can't be overwritten by a stale fill
+        cache_token = note_cache.token(note_id)
+
         response = supabase.from_('notes')\
             .select('''
                 *,
@@ -252,41 +287,9 @@ def get_note(note_id):
         except Exception:
             note_tags_map = {}
 
-        tags = []
-        if note_tags_map and note_id in note_tags_map:
-            tags = note_tags_map.get(note_id, [])
-            print(f"Using helper tags for note {note_id}: {tags}")
-        else:
-            # Fallback: parse nested structures returned by Supabase
-            print(f"Falling back to nested parsing for note {note_id}. Raw keys: {list(note_data.keys())}")
-            # try 'note_tags' structure
-            if 'note_tags' in note_data and note_data['note_tags']:
-                for nt in note_data['note_tags']:
-                    if nt and isinstance(nt, dict) and 'tag' in nt and nt['tag']:
-                        tags.append(nt['tag'])
-            # try 'tags' structure (older aliasing)
-            elif 'tags' in note_data and note_data['tags']:
-                for t in note_data['tags']:
-                    if isinstance(t, dict):
-                        if 'tag' in t and t['tag']:
-                            tags.append(t['tag'])
-                        elif 'id' in t:
-                            tags.append(t)
-        
-        # Create the complete note data
-        processed_note_data = {
-            'id': note_data.get('id'),
-            'title': note_data.get('title', ''),
-            'content': note_data.get('content', ''),
-            'created_at': note_data.get('created_at', ''),
-            'updated_at': note_data.get('updated_at', ''),
-            'tags': tags,
-            'event_date': note_data.get('event_date'),
-            'event_time': note_data.get('event_time')
-        }
-        
-        note = Note.from_dict(processed_note_data)
-        return jsonify(note.to_dict())
+        note = assemble_note(note_data, extract_note_tags(note_data, note_tags_map))
+        note_cache.set(note_id, note, cache_token)
+        return jsonify(note)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -328,6 +331,8 @@ def update_note(note_id):
                     for tag_id in data['tags']
                 ]
                 supabase.table('note_tags').insert(tag_associations).execute()
+
+        note_cache.invalidate(note_id)
         
         # Fetch the updated note with tags
         response = supabase.from_('notes')\
@@ -341,12 +346,65 @@ def update_note(note_id):
             .execute()
             
         if response.data:
+            if 'title' in data or 'content' in data:
+                _index_note(response.data[0])
             note = Note.from_dict(response.data[0])
             return jsonify(note.to_dict())
         return jsonify({'error': 'Failed to fetch updated note'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@note_bp.route('/notes/<note_id>', methods=['PATCH'])
+def patch_note(note_id):
+    """Apply a text delta to a note's content (autosave path).
+
+    Request JSON: { "base": "<updated_at>", "delta": [{"pos": 0, "del": 1, "ins": "x"}, ...],
+                    "title": "..." (optional) }
+    Delta offsets are UTF-16 code units (JavaScript string offsets).
+    Response JSON: { "id": note_id, "updated_at": "<new version>" }
+    Returns 409 with the current version if the note changed since `base`.
+    """
+    try:
+        data = request.json
+        if not data or 'base' not in data:
+            return jsonify({'error': 'Base version is required'}), 400
+
+        base = data['base']
+        update_data = {}
+
+        if data.get('delta'):
+            current = supabase.table('notes').select('content, updated_at').eq('id', note_id).execute()
+            if not current.data:
+                return jsonify({'error': 'Note not found'}), 404
+            if current.data[0]['updated_at'] != base:
+                return jsonify({'error': 'Version conflict', 'updated_at': current.data[0]['updated_at']}), 409
+            try:
+                update_data['content'] = apply_delta(current.data[0]['content'] or '', data['delta'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        if 'title' in data:
+            update_data['title'] = data['title']
+
+        if not update_data:
+            return jsonify({'error': 'No changes provided'}), 400
+
+        # Only write if nobody else has bumped the version in the meantime
+        response = supabase.table('notes').update(update_data)\
+            .eq('id', note_id)\
+            .eq('updated_at', base)\
+            .execute()
+        if not response.data:
+            current = supabase.table('notes').select('updated_at').eq('id', note_id).execute()
+            if not current.data:
+                return jsonify({'error': 'Note not found'}), 404
+            return jsonify({'error': 'Version conflict', 'updated_at': current.data[0]['updated_at']}), 409
+
+        note_cache.invalidate(note_id)
+        _index_note(response.data[0])
+        return jsonify({'id': note_id, 'updated_at': response.data[0]['updated_at']})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 
 @note_bp.route('/notes/generate', methods=['POST'])
 def generate_notes():
@@ -379,6 +437,8 @@ def delete_note(note_id):
     """Delete a specific note"""
     try:
         response = supabase.table('notes').delete().eq('id', note_id).execute()
+        note_cache.invalidate(note_id)
+        _unindex_note(note_id)
         if not response.data:
             return jsonify({'error': 'Note not found'}), 404
         return '', 204
@@ -402,3 +462,323 @@ def search_notes():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+EXPORT_PAGE_SIZE = 500
+IMPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = ['id', 'title', 'content', 'created_at', 'updated_at', 'event_date', 'event_time', 'tags']
+
+def _iter_export_rows():
+    """Yield notes page by page with their tag names flattened into a list"""
+    last_id = None
+    while True:
+        # Keyset pagination on id keeps every page an indexed range scan
+        query = supabase.table('notes').select('*')
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.order('id').limit(EXPORT_PAGE_SIZE).execute()
+        if not page.data:
+            return
+
+        # Resolve tags for just this page of notes
+        note_ids = [note['id'] for note in page.data]
+        links = supabase.table('note_tags').select('note_id, tag_id').in_('note_id', note_ids).execute()
+        tag_names = {}
+        tag_ids = list(set(link['tag_id'] for link in links.data or []))
+        if tag_ids:
+            tags = supabase.table('tags').select('id, name').in_('id', tag_ids).execute()
+            tag_names = {tag['id']: tag['name'] for tag in tags.data or []}
+        note_tag_names = {}
+        for link in links.data or []:
+            if link['tag_id'] in tag_names:
+                note_tag_names.setdefault(link['note_id'], []).append(tag_names[link['tag_id']])
+
+        for note in page.data:
+            row = {field: note.get(field) for field in EXPORT_FIELDS if field != 'tags'}
+            row['tags'] = note_tag_names.get(note['id'], [])
+            yield row
+
+        if len(page.data) < EXPORT_PAGE_SIZE:
+            return
+        last_id = page.data[-1]['id']
+
+@note_bp.route('/notes/export', methods=['GET'])
+def export_notes():
+    """Stream all notes as NDJSON (default) or CSV. Query: ?format=ndjson|csv
+
+    Tags are exported by name; in CSV they are joined with ';'. The status is sent
+    before the first page is read, so a failure part-way through ends the stream
+    with an error record ({"error": ...} in NDJSON, a "# error: ..." line in CSV)
+    instead of a silently truncated file.
+    """
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    def generate_ndjson():
+        try:
+            for row in _iter_export_rows():
+                yield json.dumps(row) + '\n'
+        except Exception as e:
+            print(f"Error exporting notes: {str(e)}")
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        try:
+            for row in _iter_export_rows():
+                row['tags'] = ';'.join(row['tags'])
+                writer.writerow(row)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        except Exception as e:
+            print(f"Error exporting notes: {str(e)}")
+            buffer.write('# error: ' + ' '.join(str(e).split()) + '\r\n')
+        yield buffer.getvalue()
+
+    if fmt == 'csv':
+        return Response(stream_with_context(generate_csv()), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=notes.csv'})
+    return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=notes.ndjson'})
+
+def _iter_import_rows(stream, fmt):
+    """Parse an uploaded NDJSON or CSV byte stream one record at a time"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        for row in csv.DictReader(text):
+            row['tags'] = [name for name in (row.get('tags') or '').split(';') if name]
+            yield row
+    else:
+        for line in text:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def _import_batch(rows):
+    """Insert one batch of notes and their tag links; returns the number of notes written"""
+    # Resolve every tag name in the batch with one lookup, creating the missing ones together
+    names = set()
+    for row in rows:
+        names.update(row['tags'])
+    tag_ids = {}
+    if names:
+        existing = supabase.table('tags').select('id, name').in_('name', list(names)).execute()
+        tag_ids = {tag['name']: tag['id'] for tag in existing.data or []}
+        missing = [{'name': name} for name in names if name not in tag_ids]
+        if missing:
+            created = supabase.table('tags').insert(missing).execute()
+            tag_ids.update({tag['name']: tag['id'] for tag in created.data or []})
+
+    note_payloads = []
+    for row in rows:
+        payload = {'title': row['title'], 'content': row['content']}
+        if row.get('event_date'):
+            payload['event_date'] = row['event_date']
+        if row.get('event_time'):
+            payload['event_time'] = row['event_time']
+        note_payloads.append(payload)
+    inserted = supabase.table('notes').insert(note_payloads).execute()
+    if not inserted.data:
+        return 0
+
+    # Multi-row inserts return rows in input order
+    tag_associations = [
+        {'note_id': note['id'], 'tag_id': tag_ids[name]}
+        for note, row in zip(inserted.data, rows)
+        for name in set(row['tags'])
+        if name in tag_ids
+    ]
+    if tag_associations:
+        supabase.table('note_tags').insert(tag_associations).execute()
+    return len(inserted.data)
+
+@note_bp.route('/notes/import', methods=['POST'])
+def import_notes():
+    """Bulk import notes from an NDJSON or CSV upload (same layout as /notes/export).
+
+    Query: ?format=ndjson|csv (defaults from Content-Type). The body is read
+    incrementally and written in batches; the response is an NDJSON stream with one
+    progress line per batch, e.g. {"imported": 500, "skipped": 0}, ending with "done": true.
+    """
+    fmt = request.args.get('format')
+    if not fmt:
+        fmt = 'csv' if 'csv' in (request.content_type or '') else 'ndjson'
+    fmt = fmt.lower()
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    stream = request.stream
+
+    def generate():
+        imported = 0
+        skipped = 0
+        batch = []
+        try:
+            for row in _iter_import_rows(stream, fmt):
+                if not isinstance(row, dict) or not row.get('title') or row.get('content') is None:
+                    skipped += 1
+                    continue
+                tags = row.get('tags') or []
+                if isinstance(tags, str):
+                    tags = [name for name in tags.split(';') if name]
+                elif not isinstance(tags, list):
+                    skipped += 1
+                    continue
+                row['tags'] = [str(name) for name in tags]
+                batch.append(row)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    imported += _import_batch(batch)
+                    batch = []
+                    yield json.dumps({'imported': imported, 'skipped': skipped}) + '\n'
+            if batch:
+                imported += _import_batch(batch)
+            yield json.dumps({'imported': imported, 'skipped': skipped, 'done': True}) + '\n'
+        except Exception as e:
+            yield json.dumps({'imported': imported, 'skipped': skipped, 'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _note_text(note):
+    return f"{note.get('title') or ''}\n{note.get('content') or ''}"
+
+def _index_note(note):
+    """Keep the related-notes index current after a write (no-op until it is loaded).
+
+    Only appends to the index's delta; a full delta is merged by the background thread.
+    """
+    if _related_index is None:
+        return
+    try:
+        _related_index.upsert(note['id'], _note_text(note), note.get('updated_at'))
+        if _related_index.needs_merge():
+            with _related_index_lock:
+                _start_related_refresh()
+    except Exception as e:
+        print(f"Error updating related-notes index: {str(e)}")
+
+def _unindex_note(note_id):
+    if _related_index is not None:
+        _related_index.remove(note_id)
+
+def _iter_notes_after(updated_at, note_id):
+    """Yield notes ordered by (updated_at, id) after the given cursor, one page at a time"""
+    while True:
+        query = supabase.table('notes').select('id, title, content, updated_at')
+        # Keyset on (updated_at, id); postgrest-py has no or_() or multi-column order()
+        # helpers, so the PostgREST parameters are added directly
+        if updated_at:
+            query.params = query.params.add(
+                'or', f'(updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt.{note_id}))'
+            )
+        query.params = query.params.add('order', 'updated_at,id')
+        page = query.limit(RELATED_CATCHUP_PAGE_SIZE).execute()
+        rows = page.data or []
+        yield from rows
+        if len(rows) < RELATED_CATCHUP_PAGE_SIZE:
+            return
+        updated_at, note_id = rows[-1]['updated_at'], rows[-1]['id']
+
+def _catch_up_related_index(index):
+    """Index notes changed after the index's cursor (e.g. by other workers or bulk imports).
+
+    An empty index is built with one merge at the end; otherwise changed notes go
+    through the delta (merged whenever it fills up), and notes whose updated_at is
+    already indexed are skipped.
+    """
+    def changed():
+        for note in _iter_notes_after(*index.cursor):
+            index.advance(note['updated_at'], note['id'])
+            yield note['id'], _note_text(note), note.get('updated_at')
+
+    if not index.ids:
+        return index.bulk_load(changed())
+    applied = 0
+    for note_id, text, updated_at in changed():
+        applied += index.upsert(note_id, text, updated_at)
+        if index.needs_merge():
+            index.merge()
+    return applied
+
+def _refresh_related_index():
+    """Load (or build) the index, catch it up and merge a full delta; runs in a background thread"""
+    global _related_index, _related_refreshing, _related_checked_at
+    index = _related_index
+    try:
+        if index is None:
+            from src.lib.related_index import RelatedNotesIndex
+            index = RelatedNotesIndex.load(RELATED_INDEX_DIR)
+        _catch_up_related_index(index)
+        if index.needs_merge():
+            index.merge()
+    except Exception as e:
+        print(f"Error refreshing related-notes index: {str(e)}")
+    finally:
+        # Published even if catching up failed part way: the cursor only covers the
+        # notes applied, so the next refresh resumes from there instead of rebuilding
+        if index is not None:
+            _related_index = index
+        with _related_index_lock:
+            _related_refreshing = False
+            _related_checked_at = time.monotonic()
+
+def get_related_index():
+    """The related-notes index, or None until it has first been loaded/built.
+
+    Loading, the first build and periodic catch-ups run in a background thread, so
+    requests never wait on them.
+    """
+    with _related_index_lock:
+        due = _related_checked_at is None or time.monotonic() - _related_checked_at >= RELATED_CATCHUP_INTERVAL
+        if due:
+            _start_related_refresh()
+    return _related_index
+
+def _start_related_refresh():
+    """Start the background refresh unless one is running; call with _related_index_lock held"""
+    global _related_refreshing
+    if not _related_refreshing:
+        _related_refreshing = True
+        threading.Thread(target=_refresh_related_index, name='related-index', daemon=True).start()
+
+@note_bp.route('/notes/<note_id>/related', methods=['GET'])
+def get_related_notes(note_id):
+    """Get the notes most similar to a note (TF-IDF cosine over title and content).
+
+    Query: ?k=<n> (default 5, max 50)
+    Response JSON: [{ "id": ..., "title": ..., "updated_at": ..., "score": 0.42 }, ...]
+    503 until the index has been loaded or built for the first time.
+    """
+    try:
+        k = min(max(request.args.get('k', 5, type=int), 1), MAX_RELATED)
+        index = get_related_index()
+        if index is None:
+            return jsonify({'error': 'Related-notes index is still loading, retry shortly'}), 503
+
+        if note_id not in index.rows:
+            note = supabase.table('notes').select('id, title, content, updated_at').eq('id', note_id).execute()
+            if not note.data:
+                return jsonify({'error': 'Note not found'}), 404
+            index.upsert(note_id, _note_text(note.data[0]), note.data[0].get('updated_at'))
+
+        # Over-fetch a little: notes deleted by another worker are dropped below
+        matches = index.related(note_id, k + 5)
+        if not matches:
+            return jsonify([])
+        rows = supabase.table('notes').select('id, title, updated_at')\
+            .in_('id', [match_id for match_id, _ in matches])\
+            .execute()
+        found = {str(row['id']): row for row in rows.data or []}
+
+        related = []
+        for match_id, score in matches:
+            row = found.get(match_id)
+            if row is None:
+                index.remove(match_id)
+                continue
+            related.append({'id': row['id'], 'title': row.get('title', ''), 'updated_at': row.get('updated_at'), 'score': round(score, 4)})
+        return jsonify(related[:k])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,14 +1,58 @@
 from flask import Blueprint, jsonify, request
 from src.models.tag import Tag
 from src.lib.supabase_client import supabase
+from src.lib.note_cache import note_cache
 
 tag_bp = Blueprint('tag', __name__)
 
+TAG_COLUMNS = 'id, name, color, created_at'
+DEFAULT_STATS_LIMIT = 20
+MAX_STATS_LIMIT = 100
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with `prefix` (code point order)"""
+    chars = list(prefix)
+    while chars:
+        code = ord(chars.pop()) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000  # surrogates can't be sent as UTF-8
+        if code <= 0x10FFFF:
+            return ''.join(chars) + chr(code)
+    return None
+
 @tag_bp.route('/tags', methods=['GET'])
 def get_tags():
-    """Get all tags"""
+    """Get all tags. Query: ?with_counts=1 to include each tag's note_count"""
     try:
-        response = supabase.table('tags').select('*').order('name').execute()
+        with_counts = request.args.get('with_counts', '').lower() in ('1', 'true', 'yes')
+        columns = TAG_COLUMNS + ', note_count' if with_counts else TAG_COLUMNS
+        response = supabase.table('tags').select(columns).order('name').execute()
+        tags = [Tag.from_dict(tag) for tag in response.data]
+        return jsonify([tag.to_dict() for tag in tags])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@tag_bp.route('/tags/stats', methods=['GET'])
+def get_tag_stats():
+    """Get tags ordered by usage (trigger-maintained note_count).
+
+    Query: ?prefix=<name prefix> (optional, for autocomplete), ?limit=<n> (default 20, max 100)
+
+    The prefix is matched case-insensitively as a range on the indexed `name_lower`
+    column rather than with LIKE, so '%', '_' and '*' in it are literal characters.
+    """
+    try:
+        query = supabase.table('tags').select(TAG_COLUMNS + ', note_count')
+        prefix = request.args.get('prefix', '').lower()
+        if prefix:
+            query = query.gte('name_lower', prefix)
+            upper = _prefix_upper_bound(prefix)
+            if upper is not None:
+                query = query.lt('name_lower', upper)
+        query = query.order('note_count', desc=True).order('name')
+        limit = min(max(request.args.get('limit', DEFAULT_STATS_LIMIT, type=int), 1), MAX_STATS_LIMIT)
+        query = query.limit(limit)
+        response = query.execute()
         tags = [Tag.from_dict(tag) for tag in response.data]
         return jsonify([tag.to_dict() for tag in tags])
     except Exception as e:
@@ -52,6 +96,9 @@ def update_tag(tag_id):
         response = supabase.table('tags').update(update_data).eq('id', tag_id).execute()
         if not response.data:
             return jsonify({'error': 'Tag not found'}), 404
+
+        # Cached notes embed tag name/color
+        note_cache.invalidate_all()
         
         tag = Tag.from_dict(response.data[0])
         return jsonify(tag.to_dict())
@@ -65,6 +112,7 @@ def delete_tag(tag_id):
         response = supabase.table('tags').delete().eq('id', tag_id).execute()
         if not response.data:
             return jsonify({'error': 'Tag not found'}), 404
+        note_cache.invalidate_all()
         return '', 204
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -96,6 +144,7 @@ def add_tag_to_note(note_id):
         }).execute()
         
         if response.data:
+            note_cache.invalidate(note_id)
             return jsonify({'message': 'Tag added to note successfully'}), 201
         return jsonify({'error': 'Failed to add tag to note'}), 500
     except Exception as e:
@@ -106,6 +155,7 @@ def remove_tag_from_note(note_id, tag_id):
     """Remove a tag from a note"""
     try:
         response = supabase.table('note_tags').delete().eq('note_id', note_id).eq('tag_id', tag_id).execute()
+        note_cache.invalidate(note_id)
         if not response.data:
             return jsonify({'error': 'Tag not found on note'}), 404
         return '', 204
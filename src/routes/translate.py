@@ -1,25 +1,115 @@
 from flask import Blueprint, request, jsonify
 import os
 import json
+import threading
 import httpx
+from concurrent.futures import ThreadPoolExecutor
 from src.lib.supabase_client import supabase
-from dotenv import load_dotenv
+from src.lib.backend_router import BackendRouter
+from src.lib.segments import split_segments, segment_hash
 
 translate_bp = Blueprint('translate', __name__)
 
-# Environment configuration
-# Load environment variables from .env file if present
-load_dotenv()
-
+# Environment configuration (loaded from .env by src/main.py when present)
 TRANSLATE_URL = os.getenv('TRANSLATE_URL', 'https://libretranslate.de')
 TRANSLATE_API_KEY = os.getenv('TRANSLATE_API_KEY')  # optional
 USE_GITHUB_MODELS = os.getenv('USE_GITHUB_MODELS', 'false').lower() in ('1', 'true', 'yes')
 GITHUB_MODELS_ENDPOINT = os.getenv('GITHUB_MODELS_ENDPOINT', 'https://models.github.ai/inference/chat/completions')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
-def call_translate_api(text: str, target: str, source: str | None = None) -> dict:
-    """Call the configured translation service and return a dict with translated text.
+GITHUB_MODELS_TIMEOUT = float(os.getenv('GITHUB_MODELS_TIMEOUT', '30'))
+TRANSLATE_TIMEOUT = float(os.getenv('TRANSLATE_TIMEOUT', '15'))
+# Race the next backend once the current one exceeds its p95 latency
+TRANSLATE_HEDGE = os.getenv('TRANSLATE_HEDGE', 'false').lower() in ('1', 'true', 'yes')
+# Open a backend's circuit after this many consecutive failures, for this many seconds
+TRANSLATE_BREAKER_FAILURES = int(os.getenv('TRANSLATE_BREAKER_FAILURES', '3'))
+TRANSLATE_BREAKER_COOLDOWN = float(os.getenv('TRANSLATE_BREAKER_COOLDOWN', '30'))
+TRANSLATE_MAX_WORKERS = int(os.getenv('TRANSLATE_MAX_WORKERS', '4'))
+
+_http_clients = {}
+_http_clients_lock = threading.Lock()
+
+def _http_client(timeout: float) -> httpx.Client:
+    """Shared, connection-pooling client per timeout.
+
+    Building an httpx.Client loads the CA bundle (tens of ms of CPU under the GIL), so
+    a client per call serialises concurrent translations.
+    """
+    with _http_clients_lock:
+        client = _http_clients.get(timeout)
+        if client is None:
+            client = _http_clients[timeout] = httpx.Client(timeout=timeout)
+        return client
+
+def _http_error(e: httpx.HTTPStatusError) -> dict:
+    """Error result for a non-2xx backend response.
+
+    4xx responses other than 408/429 are caused by the request (e.g. an unsupported
+    target language); they are flagged 'client_error' so the router neither counts
+    them against the backend's circuit nor retries them elsewhere.
+    """
+    # Include response body when available
+    msg = f"HTTP error: {str(e)}"
+    status = e.response.status_code if e.response is not None else None
+    if e.response is not None:
+        try:
+            msg += f" - {e.response.text}"
+        except Exception:
+            pass
+    if status is not None and 400 <= status < 500 and status not in (408, 429):
+        return {'error': msg, 'client_error': True}
+    return {'error': msg}
+
+
+def call_github_models(text: str, target: str, source: str | None = None) -> dict:
+    """Translate via the GitHub Models chat-completions endpoint (GITHUB_MODELS_ENDPOINT)."""
+    # Build a chat-completions style payload compatible with the GitHub Models endpoint
+    gh_payload = {
+        'model': 'openai/gpt-4o-mini',
+        'messages': [
+            {
+                'role': 'system',
+                'content': 'You are a professional translator. Translate the given text into the target language provided. Only return the translated text.'
+            },
+            {
+                'role': 'user',
+                'content': f'Translate the following text to {target}: {text}'
+            }
+        ],
+        'temperature': 0.2
+    }
+
+    headers = {
+        'Authorization': f'Bearer {GITHUB_TOKEN}' if GITHUB_TOKEN else '',
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+    }
 
-    Uses LibreTranslate-compatible API by default. Environment variables:
+    try:
+        client = _http_client(GITHUB_MODELS_TIMEOUT)
+        resp = client.post(GITHUB_MODELS_ENDPOINT, json=gh_payload, headers=headers, follow_redirects=True)
+        resp.raise_for_status()
+        data = resp.json()
+        # Expecting GitHub Models response in chat/completions format
+        # Try common shapes: {'choices': [{'message': {'content': '...'}}]} or {'choices': [{'text': '...'}]}
+        if isinstance(data, dict) and 'choices' in data and len(data['choices']) > 0:
+            choice = data['choices'][0]
+            if isinstance(choice, dict):
+                if 'message' in choice and isinstance(choice['message'], dict) and 'content' in choice['message']:
+                    return {'translatedText': choice['message']['content'].strip()}
+                if 'text' in choice:
+                    return {'translatedText': choice['text'].strip()}
+        # Fallback: return entire response as text (flagged so it is never cached)
+        return {'translatedText': json.dumps(data), 'unparsed': True}
+    except httpx.HTTPStatusError as e:
+        return _http_error(e)
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def call_libretranslate(text: str, target: str, source: str | None = None) -> dict:
+    """Translate via a LibreTranslate-compatible API.
+
+    Environment variables:
       TRANSLATE_URL - base URL (default: https://libretranslate.de)
       TRANSLATE_API_KEY - optional API key
     """
@@ -33,91 +123,65 @@ def call_translate_api(text: str, target: str, source: str | None = None) -> dic
     if TRANSLATE_API_KEY:
         payload['api_key'] = TRANSLATE_API_KEY
 
-    # If configured to use GitHub Models (or token provided and env requests it), use that API
-    if USE_GITHUB_MODELS or GITHUB_TOKEN:
-        # Build a chat-completions style payload compatible with the GitHub Models endpoint
-        gh_payload = {
-            'model': 'openai/gpt-4o-mini',
-            'messages': [
-                {
-                    'role': 'system',
-                    'content': 'You are a professional translator. Translate the given text into the target language provided. Only return the translated text.'
-                },
-                {
-                    'role': 'user',
-                    'content': f'Translate the following text to {target}: {text}'
-                }
-            ],
-            'temperature': 0.2
-        }
-
-        headers = {
-            'Authorization': f'Bearer {GITHUB_TOKEN}' if GITHUB_TOKEN else '',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
-
-        try:
-            with httpx.Client(timeout=30.0) as client:
-                resp = client.post(GITHUB_MODELS_ENDPOINT, json=gh_payload, headers=headers, follow_redirects=True)
-                resp.raise_for_status()
-                data = resp.json()
-                # Expecting GitHub Models response in chat/completions format
-                # Try common shapes: {'choices': [{'message': {'content': '...'}}]} or {'choices': [{'text': '...'}]}
-                if isinstance(data, dict) and 'choices' in data and len(data['choices']) > 0:
-                    choice = data['choices'][0]
-                    if isinstance(choice, dict):
-                        if 'message' in choice and isinstance(choice['message'], dict) and 'content' in choice['message']:
-                            return {'translatedText': choice['message']['content'].strip()}
-                        if 'text' in choice:
-                            return {'translatedText': choice['text'].strip()}
-                # Fallback: return entire response as text
-                return {'translatedText': json.dumps(data)}
-        except httpx.HTTPStatusError as e:
-            msg = f"HTTP error: {str(e)}"
-            if e.response is not None:
-                try:
-                    msg += f" - {e.response.text}"
-                except Exception:
-                    pass
-            return {'error': msg}
-        except Exception as e:
-            return {'error': str(e)}
-
-    # Fallback: use LibreTranslate-compatible API
     url = TRANSLATE_URL.rstrip('/') + '/translate'
     try:
         headers = {'Accept': 'application/json'}
-        with httpx.Client(timeout=15.0) as client:
-            # follow_redirects=True ensures POST redirects (301) are followed
-            resp = client.post(url, data=payload, headers=headers, follow_redirects=True)
-            resp.raise_for_status()
-            # Try parsing JSON response first
-            try:
-                data = resp.json()
-            except Exception:
-                # Fallback: return raw text
-                return {'translatedText': resp.text}
-            # LibreTranslate returns {'translatedText': '...'}
-            if isinstance(data, dict) and 'translatedText' in data:
-                return {'translatedText': data['translatedText']}
-            # Some providers may return text directly
-            if isinstance(data, str):
-                return {'translatedText': data}
+        client = _http_client(TRANSLATE_TIMEOUT)
+        # follow_redirects=True ensures POST redirects (301) are followed
+        resp = client.post(url, data=payload, headers=headers, follow_redirects=True)
+        resp.raise_for_status()
+        # Try parsing JSON response first
+        try:
+            data = resp.json()
+        except Exception:
+            # Fallback: return raw text (flagged so it is never cached)
+            return {'translatedText': resp.text, 'unparsed': True}
+        # LibreTranslate returns {'translatedText': '...'}
+        if isinstance(data, dict) and 'translatedText' in data:
+            return {'translatedText': data['translatedText']}
+        # Some providers may return text directly
+        if isinstance(data, str):
             return {'translatedText': data}
+        return {'translatedText': data, 'unparsed': True}
     except httpx.HTTPStatusError as e:
-        # Include response body when available
-        msg = f"HTTP error: {str(e)}"
-        if e.response is not None:
-            try:
-                msg += f" - {e.response.text}"
-            except Exception:
-                pass
-        return {'error': msg}
+        return _http_error(e)
     except Exception as e:
         return {'error': str(e)}
 
 
+def build_translate_router() -> BackendRouter:
+    """Router over the configured backends, GitHub Models first when enabled"""
+    backends = []
+    if USE_GITHUB_MODELS or GITHUB_TOKEN:
+        backends.append(('github_models', call_github_models))
+    backends.append(('libretranslate', call_libretranslate))
+    return BackendRouter(
+        backends,
+        hedge=TRANSLATE_HEDGE,
+        failure_threshold=TRANSLATE_BREAKER_FAILURES,
+        cooldown=TRANSLATE_BREAKER_COOLDOWN
+    )
+
+
+translate_router = build_translate_router()
+
+
+def call_translate_api(text: str, target: str, source: str | None = None) -> dict:
+    """Call the translation backends and return a dict with translated text (or 'error').
+
+    Backends are chosen by `translate_router`, which skips backends whose circuit is
+    open, falls over on errors and, with TRANSLATE_HEDGE enabled, races the next
+    backend once the current one runs past its p95 latency.
+    """
+    return translate_router.call(text, target, source)
+
+
+@translate_bp.route('/translate/backends', methods=['GET'])
+def translate_backends():
+    """Report latency, error rate and circuit state for each translation backend"""
+    return jsonify(translate_router.snapshot())
+
+
 @translate_bp.route('/translate', methods=['POST'])
 def translate_text():
     """Translate arbitrary text.
@@ -136,18 +200,110 @@ def translate_text():
 
         result = call_translate_api(text, target, source)
         if 'error' in result:
-            return jsonify({'error': result['error']}), 502
+            return jsonify({'error': result['error']}), 400 if result.get('client_error') else 502
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _source_key(source: str | None) -> str:
+    """Cache key for the source language; '' when it is left to the backend to detect"""
+    source = (source or '').strip().lower()
+    return '' if source == 'auto' else source
+
+
+def get_cached_segments(hashes: list, target: str, source: str | None = None) -> dict:
+    """Return {segment_hash: translated_text} for segments already translated from source to target"""
+    if not hashes:
+        return {}
+    try:
+        resp = supabase.table('translation_segments')\
+            .select('segment_hash, translated_text')\
+            .eq('source_lang', _source_key(source))\
+            .eq('target_lang', target)\
+            .in_('segment_hash', hashes)\
+            .execute()
+        return {row['segment_hash']: row['translated_text'] for row in resp.data or []}
+    except Exception as e:
+        # The cache is an optimisation; translate everything if it is unavailable
+        print(f"Error reading translation cache: {str(e)}")
+        return {}
+
+
+def store_cached_segments(translated: dict, target: str, source: str | None = None) -> None:
+    """Persist freshly translated segments ({segment_hash: translated_text})"""
+    if not translated:
+        return
+    source_lang = _source_key(source)
+    rows = [
+        {'segment_hash': h, 'source_lang': source_lang, 'target_lang': target, 'translated_text': t}
+        for h, t in translated.items()
+    ]
+    try:
+        supabase.table('translation_segments')\
+            .upsert(rows, on_conflict='segment_hash,source_lang,target_lang')\
+            .execute()
+    except Exception as e:
+        print(f"Error writing translation cache: {str(e)}")
+
+
+def translate_segments(text: str, target: str, source: str | None = None) -> dict:
+    """Translate text segment by segment, reusing cached segments.
+
+    Only segments whose hash is not cached for (`source`, `target`) are sent to the
+    backend, in parallel. Responses the backend did not return in a recognised shape
+    are used for this call but not cached. Returns {'translatedText': ..., 'segments': {...}} or {'error': ...}.
+    """
+    segments = split_segments(text)
+    pending = {}
+    for piece, translatable in segments:
+        if translatable:
+            pending.setdefault(segment_hash(piece), piece)
+
+    cached = get_cached_segments(list(pending), target, source)
+    missing = {h: piece for h, piece in pending.items() if h not in cached}
+
+    fresh = {}
+    cacheable = {}
+    errors = []  # error results
+    if missing:
+        workers = max(1, min(TRANSLATE_MAX_WORKERS, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda piece: call_translate_api(piece, target, source), missing.values())
+            for h, result in zip(missing, results):
+                if 'error' in result:
+                    errors.append(result)
+                else:
+                    fresh[h] = str(result.get('translatedText', ''))
+                    if not result.get('unparsed') and isinstance(result.get('translatedText'), str):
+                        cacheable[h] = fresh[h]
+
+    # Keep whatever succeeded so a retry only resends the failed segments
+    store_cached_segments(cacheable, target, source)
+    if errors:
+        return errors[0]
+
+    translations = {**cached, **fresh}
+    translated_text = ''.join(
+        translations[segment_hash(piece)] if translatable else piece
+        for piece, translatable in segments
+    )
+    return {
+        'translatedText': translated_text,
+        'segments': {'total': len(pending), 'cached': len(pending) - len(missing), 'translated': len(fresh)}
+    }
+
+
 @translate_bp.route('/notes/<note_id>/translate', methods=['POST'])
 def translate_note(note_id):
     """Translate the content of a note by ID and return translated text.
 
+    The note is split into paragraph/sentence segments; only segments not already
+    translated from `source` to `target` are sent to the translation backend.
+
     Request JSON: { "target": "en", "source": "auto" (optional) }
-    Response JSON: { "id": note_id, "original": "...", "translatedText": "..." }
+    Response JSON: { "id": note_id, "original": "...", "translatedText": "...",
+                     "segments": { "total": n, "cached": n, "translated": n } }
     """
     try:
         data = request.json or {}
@@ -165,10 +321,15 @@ def translate_note(note_id):
         note = resp.data[0]
         text = note.get('content', '')
 
-        result = call_translate_api(text, target, source)
+        result = translate_segments(text, target, source)
         if 'error' in result:
-            return jsonify({'error': result['error']}), 502
+            return jsonify({'error': result['error']}), 400 if result.get('client_error') else 502
 
-        return jsonify({'id': note_id, 'original': text, 'translatedText': result.get('translatedText')})
+        return jsonify({
+            'id': note_id,
+            'original': text,
+            'translatedText': result.get('translatedText'),
+            'segments': result.get('segments')
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,12 +1,37 @@
 from flask import Blueprint, jsonify, request
-from src.models.user import User, db
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from src.models.user import User, db, init_db
 
 user_bp = Blueprint('user', __name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+BULK_INSERT_BATCH_SIZE = 1000
+
+@user_bp.record_once
+def _init_db(state):
+    init_db(state.app)
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """List users ordered by id using keyset pagination.
+
+    Query: ?limit=<n> (default 100, max 1000), ?after_id=<id> (last id of the previous page)
+    The id to pass as after_id for the next page is returned in the X-Next-After-Id header.
+    """
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    after_id = request.args.get('after_id', type=int)
+
+    query = User.query.order_by(User.id)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    users = query.limit(limit).all()
+
+    response = jsonify([user.to_dict() for user in users])
+    if len(users) == limit:
+        response.headers['X-Next-After-Id'] = str(users[-1].id)
+    return response
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -17,6 +42,32 @@ def create_user():
     db.session.commit()
     return jsonify(user.to_dict()), 201
 
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    """Create many users at once. Request JSON: [{ "username": "...", "email": "..." }, ...]
+
+    Rows are written with executemany-style inserts in batches, in a single transaction.
+    """
+    data = request.json
+    if not isinstance(data, list):
+        return jsonify({'error': 'Expected a list of users'}), 400
+
+    rows = []
+    for item in data:
+        if not isinstance(item, dict) or not item.get('username') or not item.get('email'):
+            return jsonify({'error': 'Each user needs a username and email'}), 400
+        rows.append({'username': item['username'], 'email': item['email']})
+
+    try:
+        for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+            db.session.execute(insert(User), rows[start:start + BULK_INSERT_BATCH_SIZE])
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({'error': f'Duplicate username or email: {e.orig}'}), 409
+
+    return jsonify({'inserted': len(rows)}), 201
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -55,4 +55,60 @@ create trigger on_notes_updated
 
 -- Add event date/time fields to notes if they don't exist
 alter table public.notes add column if not exists event_date date;
-alter table public.notes add column if not exists event_time time;
\ No newline at end of file
+alter table public.notes add column if not exists event_time time;
+
+-- Per-segment translation cache, keyed by a hash of the source segment text and the
+-- language pair ('' as source_lang when the backend detects it)
+create table if not exists public.translation_segments (
+  segment_hash text not null,
+  source_lang text not null default '',
+  target_lang text not null,
+  translated_text text not null,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (segment_hash, source_lang, target_lang)
+);
+
+-- Upgrade caches created before source_lang was part of the key
+alter table public.translation_segments add column if not exists source_lang text not null default '';
+alter table public.translation_segments drop constraint if exists translation_segments_pkey;
+alter table public.translation_segments add primary key (segment_hash, source_lang, target_lang);
+
+-- Per-tag note counts, maintained incrementally by note_tags triggers
+alter table public.tags add column if not exists note_count integer default 0 not null;
+
+create index if not exists tags_note_count_idx on public.tags (note_count desc);
+-- Lower-cased name for prefix autocomplete (/api/tags/stats?prefix=). "C" collation
+-- orders by code point, so a prefix is one range scan on the index
+alter table public.tags add column if not exists name_lower text collate "C"
+  generated always as (lower(name)) stored;
+create index if not exists tags_name_lower_idx on public.tags (name_lower);
+create index if not exists note_tags_tag_id_idx on public.note_tags (tag_id);
+
+create or replace function public.handle_note_tags_count()
+returns trigger
+language plpgsql
+as $$
+begin
+  if (tg_op = 'INSERT') then
+    update public.tags set note_count = note_count + 1 where id = new.tag_id;
+    return new;
+  elsif (tg_op = 'DELETE') then
+    update public.tags set note_count = greatest(note_count - 1, 0) where id = old.tag_id;
+    return old;
+  elsif (new.tag_id is distinct from old.tag_id) then
+    update public.tags set note_count = greatest(note_count - 1, 0) where id = old.tag_id;
+    update public.tags set note_count = note_count + 1 where id = new.tag_id;
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists on_note_tags_count on public.note_tags;
+create trigger on_note_tags_count
+  after insert or update of tag_id or delete on public.note_tags
+  for each row
+  execute function handle_note_tags_count();
+
+-- Backfill counts for existing associations
+update public.tags t
+  set note_count = (select count(*) from public.note_tags nt where nt.tag_id = t.id);